@@ -0,0 +1,121 @@
+"""
+Benchmark the Calendar partial-response field mask.
+
+Builds synthetic events.list pages shaped like real meetings (attendee
+lists, descriptions, conference data), applies gcal_events.LIST_FIELDS the
+way the API does, and compares payload size and JSON parse time with the
+full resources.
+
+Usage:
+  python benchmarks/bench_calendar_fields.py [--events 250] [--attendees 20]
+"""
+
+import argparse
+import datetime
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import gcal_events
+
+
+def full_event(i: int, start: datetime.datetime, attendees: int) -> dict:
+    end = start + datetime.timedelta(minutes=random.choice([30, 60, 90]))
+    return {
+        "kind": "calendar#event",
+        "etag": f'"{random.getrandbits(64)}"',
+        "id": f"event{i:06d}",
+        "status": "confirmed",
+        "htmlLink": f"https://www.google.com/calendar/event?eid=event{i:06d}",
+        "created": "2025-01-01T09:00:00.000Z",
+        "updated": "2025-06-01T09:00:00.000Z",
+        "summary": f"Group meeting {i}",
+        "description": "Agenda: " + " ".join(random.choice(["data", "paper", "survey", "review"]) for _ in range(80)),
+        "location": "Room 3.14",
+        "creator": {"email": "organiser@example.org"},
+        "organizer": {"email": "organiser@example.org", "displayName": "Organiser"},
+        "start": {"dateTime": start.isoformat(), "timeZone": "Europe/London"},
+        "end": {"dateTime": end.isoformat(), "timeZone": "Europe/London"},
+        "recurringEventId": f"series{i % 7}",
+        "iCalUID": f"event{i:06d}@google.com",
+        "sequence": 0,
+        "attendees": [
+            {"email": f"person{j}@example.org", "displayName": f"Person {j}", "responseStatus": "accepted"}
+            for j in range(attendees)
+        ],
+        "conferenceData": {
+            "entryPoints": [{"entryPointType": "video", "uri": "https://meet.google.com/abc-defg-hij"}],
+            "conferenceSolution": {"name": "Google Meet"},
+        },
+        "reminders": {"useDefault": True},
+        "eventType": "default",
+    }
+
+
+def parse_mask(mask: str) -> dict:
+    """Parse a fields mask like 'a,b,items(c,d)' into {'a': {}, 'b': {}, 'items': {'c': {}, 'd': {}}}."""
+    tree: dict = {}
+    stack = [tree]
+    name = ""
+    for ch in mask + ",":
+        if ch in ",()":
+            if name:
+                stack[-1][name] = {}
+            if ch == "(":
+                stack.append(stack[-1][name])
+            elif ch == ")":
+                stack.pop()
+            name = ""
+        else:
+            name += ch
+    return tree
+
+
+def apply_mask(value, tree: dict):
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [apply_mask(v, tree) for v in value]
+    return {k: apply_mask(v, tree[k]) for k, v in value.items() if k in tree}
+
+
+def measure(payload: dict, repeat: int = 20) -> tuple[int, float]:
+    body = json.dumps(payload).encode()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        json.loads(body)
+    return len(body), (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=250, help="Events per page (default: 250, the API maximum)")
+    parser.add_argument("--attendees", type=int, default=20, help="Attendees per event (default: 20)")
+    args = parser.parse_args()
+
+    random.seed(0)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    page = {
+        "kind": "calendar#events",
+        "summary": "primary",
+        "nextSyncToken": "CPjVx7m",
+        "items": [
+            full_event(i, now + datetime.timedelta(hours=3 * i), args.attendees) for i in range(args.events)
+        ],
+    }
+    masked = apply_mask(page, parse_mask(gcal_events.LIST_FIELDS))
+
+    full_bytes, full_ms = measure(page)
+    masked_bytes, masked_ms = measure(masked)
+    print(f"events.list page of {args.events} events, {args.attendees} attendees each:")
+    print(f"  full resources   {full_bytes / 1024:9.1f} kB   parse {full_ms:7.2f} ms")
+    print(f"  fields mask      {masked_bytes / 1024:9.1f} kB   parse {masked_ms:7.2f} ms")
+    print(f"  saved            {(full_bytes - masked_bytes) / 1024:9.1f} kB   ({full_bytes / masked_bytes:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
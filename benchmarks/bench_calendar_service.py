@@ -0,0 +1,69 @@
+"""
+Benchmark Calendar service construction.
+
+Compares what every fetch_events call used to pay (read token.json and
+build the client) with the cached get_calendar_service. Runs offline
+against a throwaway token.json.
+
+Usage:
+  python benchmarks/bench_calendar_service.py [--repeat 20]
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import gcal_events
+
+
+def write_fake_token(path: Path) -> None:
+    path.write_text(json.dumps({
+        "token": "fake-access-token",
+        "expiry": "2099-01-01T00:00:00Z",
+        "refresh_token": "fake-refresh-token",
+        "client_id": "fake.apps.googleusercontent.com",
+        "client_secret": "fake-secret",
+        "scopes": gcal_events.SCOPES,
+    }))
+
+
+def time_calls(fn, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label: str, timings: list[float]) -> None:
+    first = timings[0] * 1000
+    rest = sorted(timings[1:]) or timings
+    median = rest[len(rest) // 2] * 1000
+    print(f"  {label:<28} first {first:8.2f} ms   median after {median:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="Calls per variant (default: 20)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        gcal_events.TOKEN_PATH = Path(tmp) / "token.json"
+        write_fake_token(gcal_events.TOKEN_PATH)
+
+        print(f"Calendar service construction, {args.repeat} calls each:")
+        report(
+            "per call (before)",
+            time_calls(lambda: gcal_events.build_service(gcal_events.load_credentials()), args.repeat),
+        )
+        report("process singleton (after)", time_calls(gcal_events.get_calendar_service, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark (and guard) interpreter import cost per plan.py mode.
+
+Each mode runs as a real plan.py command, from the last sync and with a
+placeholder database id so no account or network is needed, in a fresh
+interpreter under `python -X importtime`. The cumulative time of the
+top-level imports, including those made lazily inside plan.run(), is
+reported. Exits non-zero if a mode imports a module it must not
+(google.genai, the OAuth browser flow) or `next` exceeds --budget-ms, so
+it can be run as a regression check.
+
+Usage:
+  python benchmarks/bench_import_time.py [--repeat 5] [--budget-ms 400]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# plan.py arguments for each mode; neither may contact an API
+MODE_COMMANDS = {
+    "next": ["next", "--leave", "23:59", "--offline"],
+    "day --local": ["day", "--local", "--offline", "--output", os.devnull],
+}
+
+# Modules that must never be loaded in a given mode
+FORBIDDEN = {
+    "next": ["google.genai", "google_auth_oauthlib"],
+    "day --local": ["google.genai", "google_auth_oauthlib"],
+}
+
+
+def measure(argv: list[str]) -> tuple[float, set[str]]:
+    """Run plan.py with *argv* in a fresh interpreter; return (ms, names of all modules loaded)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", str(ROOT / "plan.py"), *argv],
+        env={**os.environ, "NOTION_DATABASE_ID": "bench-import-time"},
+        capture_output=True, text=True,
+    )
+    if result.returncode:
+        sys.exit(f"plan.py {' '.join(argv)} failed:\n{result.stdout}")
+    total_us = 0
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name[1:]
+        loaded.add(name.strip())
+        # Nested imports are indented; only count top-level ones
+        if not name.startswith(" "):
+            total_us += int(cumulative)
+    return total_us / 1000, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per mode (default: 5)")
+    parser.add_argument("--budget-ms", type=float, default=400, help="Maximum median import time for `next` (default: 400)")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"Import time per mode, median of {args.repeat} runs:")
+    for mode, argv in MODE_COMMANDS.items():
+        timings = []
+        for _ in range(args.repeat):
+            ms, loaded = measure(argv)
+            timings.append(ms)
+        median = statistics.median(timings)
+        print(f"  {mode:<12} {median:8.1f} ms")
+
+        for forbidden in FORBIDDEN.get(mode, []):
+            if forbidden in loaded:
+                failures.append(f"`{mode}` imports {forbidden}")
+        if mode == "next" and median > args.budget_ms:
+            failures.append(f"`next` imports take {median:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark plan.py stage by stage against local stand-ins for Notion,
+Google Calendar and Gemini (see fakes.py), at several task-database sizes.
+
+For each size, a fresh local store is synced from synthetic pages and
+events, then each stage is timed on its own, followed by whole `next` and
+`day` runs through plan.main. No accounts or network access needed.
+
+Usage:
+  python benchmarks/bench_pipeline.py [--tasks 10,1000,100000] [--events 300]
+      [--max-tasks 40] [--token-budget 4000] [--notion-ms 20] [--notion-rps 0]
+      [--calendar-ms 20] [--gemini-ms 200]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import claude_planner
+import gcal_events
+import notion_tasks
+import plan
+import fakes
+
+
+def timed(fn) -> tuple[object, float]:
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def run_stages(n_tasks: int, args, tmp: Path) -> dict[str, float]:
+    """Time every stage for a database of *n_tasks*; return {stage: ms}."""
+    pages = fakes.make_pages(n_tasks, notes_chars=args.notes_chars)
+    notion = fakes.FakeNotion(pages, latency=args.notion_ms / 1000)
+    calendar = fakes.FakeCalendar(fakes.make_events(args.events), latency=args.calendar_ms / 1000)
+    texts = [notion_tasks.get_title(page["properties"]) for page in pages]
+    gemini = fakes.FakeGemini(texts, plan_lines=args.plan_lines, latency=args.gemini_ms / 1000)
+    fakes.install(notion, calendar, gemini, tmp / f"bench_{n_tasks}.db")
+
+    ms = {}
+    _, ms["notion full sync"] = timed(lambda: notion_tasks.get_todo_tasks(full_sync=True))
+    tasks, ms["notion incremental sync"] = timed(notion_tasks.get_todo_tasks)
+
+    window = gcal_events.EventWindow([gcal_events.get_next_two_weeks_bounds(), gcal_events.get_week_bounds()])
+    _, ms["calendar full sync"] = timed(lambda: window.fetch(full_sync=True))
+    _, ms["calendar incremental sync"] = timed(window.fetch)
+
+    upcoming = gcal_events.get_events_next_two_weeks(window)
+    tasks, ms["apply_meeting_deadlines"] = timed(lambda: plan.apply_meeting_deadlines(tasks, upcoming))
+    _, ms["format_tasks_for_prompt (all)"] = timed(lambda: notion_tasks.format_tasks_for_prompt(tasks))
+    (prompt_tasks, tasks_text), ms["select_tasks"] = timed(
+        lambda: claude_planner.select_tasks(plan.rank_tasks(tasks, 240), args.max_tasks, args.token_budget)
+    )
+    week = gcal_events.get_events_this_week(window=window)
+    events_text, ms["format_events_for_prompt"] = timed(lambda: gcal_events.format_events_for_prompt(week))
+
+    user_message = claude_planner.daily_user_message(tasks_text, events_text, "Monday", "10:00", "18:00")
+    plan_text, ms["gemini generate (fake)"] = timed(
+        lambda: claude_planner.generate(claude_planner.DAILY_SYSTEM_PROMPT, user_message, use_cache=False)
+    )
+    _, ms["reinsert_project_tags"] = timed(
+        lambda: claude_planner.reinsert_project_tags(plan_text, claude_planner.build_tag_lookup(prompt_tasks))
+    )
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, ms["end to end: next"] = timed(lambda: plan.main(["next", "--leave", "23:59"]))
+        _, ms["end to end: day"] = timed(
+            lambda: plan.main(["day", "--no-cache", "--output", str(tmp / f"day_{n_tasks}.md")])
+        )
+    return ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", default="10,1000,100000", help="Comma-separated database sizes (default: 10,1000,100000)")
+    parser.add_argument("--events", type=int, default=300, help="Calendar events in the cache span (default: 300)")
+    parser.add_argument("--notes-chars", type=int, default=500, help="Size of each page's unread Notes property (default: 500)")
+    parser.add_argument("--plan-lines", type=int, default=30, help="Task lines in each fake Gemini plan (default: 30)")
+    parser.add_argument("--max-tasks", type=int, default=40, help="Tasks listed in the prompt (default: 40)")
+    parser.add_argument("--token-budget", type=int, default=4000, help="Token budget for the task list (default: 4000)")
+    parser.add_argument("--notion-ms", type=float, default=20, help="Latency per Notion request (default: 20)")
+    parser.add_argument(
+        "--notion-rps",
+        type=float,
+        default=0,
+        help="Cap full-sync Notion requests per second, as the app does (default: 0, no cap; the fake never rate-limits)",
+    )
+    parser.add_argument("--calendar-ms", type=float, default=20, help="Latency per Calendar request (default: 20)")
+    parser.add_argument("--gemini-ms", type=float, default=200, help="Latency per Gemini request (default: 200)")
+    args = parser.parse_args()
+
+    sizes = [int(n) for n in args.tasks.split(",")]
+    notion_tasks.MAX_REQUESTS_PER_SECOND = args.notion_rps or None
+    os.environ.update(NOTION_TOKEN="fake", NOTION_DATABASE_ID="bench", GEMINI_API_KEY="fake")
+    os.environ["GOOGLE_CALENDAR_ID"] = "primary"
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            print(f"Running {n} tasks...", file=sys.stderr)
+            results[n] = run_stages(n, args, Path(tmp))
+
+    print(f"\nStage timings in ms ({args.notion_ms:g}/{args.calendar_ms:g}/{args.gemini_ms:g} ms "
+          f"Notion/Calendar/Gemini latency, {args.events} events):")
+    print(f"  {'stage':<32}" + "".join(f"{f'{n} tasks':>14}" for n in sizes))
+    for stage in results[sizes[0]]:
+        print(f"  {stage:<32}" + "".join(f"{results[n][stage]:14.1f}" for n in sizes))
+
+
+if __name__ == "__main__":
+    main()
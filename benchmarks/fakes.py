@@ -0,0 +1,347 @@
+"""
+In-process stand-ins for the Notion, Google Calendar and Gemini clients,
+and generators for synthetic tasks and events, so plan.py can be timed
+end to end without live accounts.
+
+Each fake sleeps for a configurable latency per request and returns
+payloads shaped like the real APIs': Notion pages of 100 with cursors,
+honouring filters and filter_properties; events().list pages with
+nextPageToken and sync tokens, plus batch requests; Gemini plans that
+mention real task texts. install() patches them into the app modules.
+"""
+
+import asyncio
+import datetime
+import json
+import random
+import time
+import types
+from pathlib import Path
+
+import claude_planner
+import gcal_events
+import notion_tasks
+import store
+import usage
+
+NOTION_PAGE_SIZE = 100
+
+PROJECTS = ["JADES", "COSMOS", "CMB/LSS", "Euclid", "DESI", "LSST", "Roman", "SPHEREx", "Teaching", "Admin"]
+WORDS = ["draft", "review", "paper", "figure", "referee", "report", "code", "survey", "proposal", "slides",
+         "analysis", "catalogue", "pipeline", "email", "data", "model", "fit", "chapter", "notes", "plan"]
+
+# Property ids as the Notion schema reports them
+SCHEMA = {
+    "Task": {"id": "title", "type": "title"},
+    "Project": {"id": "pj%3A", "type": "multi_select"},
+    "Status": {"id": "st%3A", "type": "select"},
+    "Priority": {"id": "pr%3A", "type": "select"},
+    "Effort": {"id": "ef%3A", "type": "select"},
+    "Quick": {"id": "qk%3A", "type": "checkbox"},
+    "Notes": {"id": "nt%3A", "type": "rich_text"},
+}
+
+
+# --- synthetic data ---
+
+def make_pages(n: int, notes_chars: int = 500, seed: int = 0) -> list[dict]:
+    """*n* Notion pages shaped like the task database, ~10% done and ~15% pending."""
+    rng = random.Random(seed)
+    edited = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    projects = PROJECTS + [f"Project {i}" for i in range(max(0, n // 50 - len(PROJECTS)))]
+    pages = []
+    for i in range(n):
+        edited += datetime.timedelta(seconds=rng.randint(1, 600))
+        status = rng.choices(["actionable", "pending", "done"], weights=[75, 15, 10])[0]
+        props = {
+            "Task": {"title": [{"plain_text": " ".join(rng.sample(WORDS, 3)) + f" #{i}"}]},
+            "Project": {"multi_select": [{"name": rng.choice(projects)}]},
+            "Status": {"select": {"name": status}},
+            "Priority": {"select": {"name": rng.choice(["high", "medium", "low"])}},
+            "Effort": {"select": {"name": rng.choice(["high", "medium", "low"])}},
+            "Quick": {"checkbox": rng.random() < 0.2},
+            "Notes": {"rich_text": [{"plain_text": "x" * notes_chars}]},
+        }
+        for name, prop in props.items():
+            prop.update(SCHEMA[name])
+        pages.append({
+            "object": "page",
+            "id": f"page-{i:06d}",
+            "last_edited_time": edited.strftime("%Y-%m-%dT%H:%M:00.000Z"),
+            "in_trash": False,
+            "properties": props,
+        })
+    return pages
+
+
+def make_events(n: int, days: int = 67, seed: int = 0) -> list[dict]:
+    """*n* timed events spread over *days* from a week ago, sorted by start,
+    in events().list item format. Some titles name a task project."""
+    rng = random.Random(seed)
+    tz = datetime.timezone.utc
+    first = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=7), datetime.time(9), tzinfo=tz)
+    items = []
+    for i in range(n):
+        start = first + datetime.timedelta(days=rng.randrange(days), minutes=30 * rng.randrange(16))
+        end = start + datetime.timedelta(minutes=rng.choice([30, 60, 90]))
+        summary = f"{rng.choice(PROJECTS)} telecon" if rng.random() < 0.3 else f"Seminar {i}"
+        items.append({
+            "id": f"event{i:06d}",
+            "status": "confirmed",
+            "summary": summary,
+            "start": {"dateTime": start.isoformat()},
+            "end": {"dateTime": end.isoformat()},
+        })
+    items.sort(key=lambda item: item["start"]["dateTime"])
+    return items
+
+
+# --- Notion ---
+
+def _matches(page: dict, query_filter: dict) -> bool:
+    if "and" in query_filter:
+        return all(_matches(page, f) for f in query_filter["and"])
+    if query_filter.get("timestamp") == "last_edited_time":
+        return page["last_edited_time"] >= query_filter["last_edited_time"]["on_or_after"]
+    select = page["properties"][query_filter["property"]]["select"]
+    value = select["name"] if select else None
+    condition = query_filter["select"]
+    if "equals" in condition:
+        return value == condition["equals"]
+    return value != condition["does_not_equal"]
+
+
+class _NotionDataSources:
+    def __init__(self, pages: list[dict], latency: float):
+        self.pages = pages
+        self.latency = latency
+        self.requests = 0
+        self._filtered = {}
+
+    def retrieve(self, data_source_id: str, **kwargs) -> dict:
+        self.requests += 1
+        time.sleep(self.latency)
+        return {"object": "data_source", "id": data_source_id, "properties": SCHEMA}
+
+    def _page(self, query_filter=None, start_cursor=None, filter_properties=None, **kwargs) -> dict:
+        self.requests += 1
+        key = json.dumps(query_filter, sort_keys=True)
+        if key not in self._filtered:
+            self._filtered[key] = [p for p in self.pages if not query_filter or _matches(p, query_filter)]
+        matching = self._filtered[key]
+
+        offset = int(start_cursor or 0)
+        results = matching[offset:offset + NOTION_PAGE_SIZE]
+        if filter_properties:
+            wanted = set(filter_properties)
+            results = [
+                dict(page, properties={
+                    name: prop for name, prop in page["properties"].items()
+                    if prop["id"].replace("%3A", ":") in wanted
+                })
+                for page in results
+            ]
+        more = offset + NOTION_PAGE_SIZE < len(matching)
+        response = {
+            "object": "list",
+            "results": results,
+            "has_more": more,
+            "next_cursor": str(offset + NOTION_PAGE_SIZE) if more else None,
+        }
+        # Round-trip through JSON, as the real client parses a response body
+        return json.loads(json.dumps(response))
+
+    def query(self, data_source_id: str, filter: dict | None = None, **kwargs) -> dict:
+        time.sleep(self.latency)
+        return self._page(filter, **kwargs)
+
+
+class _AsyncNotionDataSources:
+    def __init__(self, sync: _NotionDataSources):
+        self.sync = sync
+
+    async def query(self, data_source_id: str, filter: dict | None = None, **kwargs) -> dict:
+        await asyncio.sleep(self.sync.latency)
+        return self.sync._page(filter, **kwargs)
+
+
+class FakeNotion:
+    """Stands in for notion_client.Client: data_sources.query and .retrieve."""
+
+    def __init__(self, pages: list[dict], latency: float = 0.02):
+        self.data_sources = _NotionDataSources(pages, latency)
+
+
+class FakeAsyncNotion:
+    """Stands in for notion_client.AsyncClient, sharing *notion*'s pages and counters."""
+
+    def __init__(self, notion: FakeNotion):
+        self.data_sources = _AsyncNotionDataSources(notion.data_sources)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+# --- Google Calendar ---
+
+class _Response(dict):
+    def __init__(self, status: int):
+        super().__init__(status=str(status))
+        self.status = status
+        self.reason = "OK"
+
+
+class _Request:
+    """An HttpRequest look-alike: execute() sleeps, then runs postproc on a JSON body."""
+
+    def __init__(self, body, latency: float):
+        self._body = body
+        self._latency = latency
+        self.postproc = lambda resp, content: json.loads(content)
+
+    def _respond(self):
+        return self.postproc(_Response(200), json.dumps(self._body()).encode())
+
+    def execute(self, *args, **kwargs):
+        time.sleep(self._latency)
+        return self._respond()
+
+
+class _Batch:
+    def __init__(self, callback, latency: float):
+        self._callback = callback
+        self._latency = latency
+        self._requests = []
+
+    def add(self, request: _Request, request_id: str) -> None:
+        self._requests.append((request_id, request))
+
+    def execute(self) -> None:
+        time.sleep(self._latency)
+        for request_id, request in self._requests:
+            self._callback(request_id, request._respond(), None)
+
+
+class _Events:
+    def __init__(self, calendar: "FakeCalendar"):
+        self.calendar = calendar
+
+    def list(self, calendarId: str, maxResults: int = 250, pageToken: str | None = None,
+             syncToken: str | None = None, timeMin: str | None = None, timeMax: str | None = None,
+             **kwargs) -> _Request:
+        calendar = self.calendar
+
+        def body():
+            calendar.requests += 1
+            if syncToken:
+                # Nothing changed since the last sync
+                items = []
+            else:
+                lo = datetime.datetime.fromisoformat(timeMin) if timeMin else None
+                hi = datetime.datetime.fromisoformat(timeMax) if timeMax else None
+                items = [
+                    item for item in calendar.items
+                    if (lo is None or datetime.datetime.fromisoformat(item["end"]["dateTime"]) > lo)
+                    and (hi is None or datetime.datetime.fromisoformat(item["start"]["dateTime"]) < hi)
+                ]
+            offset = int(pageToken or 0)
+            response = {"items": items[offset:offset + maxResults]}
+            if offset + maxResults < len(items):
+                response["nextPageToken"] = str(offset + maxResults)
+            else:
+                response["nextSyncToken"] = "sync-token"
+            return response
+
+        return _Request(body, calendar.latency)
+
+
+class FakeCalendar:
+    """Stands in for the Calendar API service: events().list and batch requests."""
+
+    def __init__(self, items: list[dict], latency: float = 0.02):
+        self.items = items
+        self.latency = latency
+        self.requests = 0
+
+    def events(self) -> _Events:
+        return _Events(self)
+
+    def new_batch_http_request(self, callback) -> _Batch:
+        return _Batch(callback, self.latency)
+
+
+# --- Gemini ---
+
+class _Models:
+    def __init__(self, gemini: "FakeGemini"):
+        self.gemini = gemini
+
+    def _plan(self, contents: str, config) -> types.SimpleNamespace:
+        gemini = self.gemini
+        rng = random.Random(len(contents))
+        lines = ["## Plan", ""]
+        for i in range(gemini.plan_lines):
+            start, end = 9 * 60 + 15 * i, 9 * 60 + 15 * (i + 1)
+            text = rng.choice(gemini.task_texts) if gemini.task_texts else "write paper"
+            lines.append(f"- [ ] {start // 60:02d}:{start % 60:02d}–{end // 60:02d}:{end % 60:02d} — "
+                         f"{text} (priority: high, effort: low)")
+        text = "\n".join(lines) + "\n"
+        usage = types.SimpleNamespace(
+            prompt_token_count=len(contents) // 4,
+            cached_content_token_count=0,
+            candidates_token_count=len(text) // 4,
+        )
+        return types.SimpleNamespace(text=text, usage_metadata=usage)
+
+    def generate_content(self, model: str, contents: str, config=None):
+        self.gemini.requests += 1
+        time.sleep(self.gemini.latency)
+        return self._plan(contents, config)
+
+    def generate_content_stream(self, model: str, contents: str, config=None):
+        self.gemini.requests += 1
+        response = self._plan(contents, config)
+        time.sleep(self.gemini.latency)
+        for i in range(0, len(response.text), 200):
+            yield types.SimpleNamespace(text=response.text[i:i + 200], usage_metadata=response.usage_metadata)
+
+    def count_tokens(self, model: str, contents: str, config=None):
+        self.gemini.requests += 1
+        time.sleep(self.gemini.latency / 10)
+        return types.SimpleNamespace(total_tokens=len(contents) // 4)
+
+
+class _Caches:
+    def create(self, model: str, config=None):
+        return types.SimpleNamespace(name="cachedContents/fake")
+
+
+class FakeGemini:
+    """Stands in for google.genai.Client: models.generate_content(_stream), models.count_tokens
+    and caches.create.
+    Plans have *plan_lines* entries naming tasks from *task_texts*."""
+
+    def __init__(self, task_texts: list[str], plan_lines: int = 30, latency: float = 0.2):
+        self.task_texts = task_texts
+        self.plan_lines = plan_lines
+        self.latency = latency
+        self.requests = 0
+        self.models = _Models(self)
+        self.caches = _Caches()
+
+
+def install(notion: FakeNotion, calendar: FakeCalendar, gemini: FakeGemini, store_path: Path) -> None:
+    """Route the app's API clients to the fakes, and its local store and Gemini
+    usage log to *store_path* and a log file beside it."""
+    notion_tasks.get_notion_client = lambda: notion
+    notion_tasks.get_async_notion_client = lambda: FakeAsyncNotion(notion)
+    gcal_events.get_calendar_service = lambda: calendar
+    claude_planner.get_client = lambda: gemini
+    store.STORE_PATH = store_path
+    usage.USAGE_LOG_PATH = store_path.with_suffix(".usage.jsonl")
@@ -1,11 +1,51 @@
 """
 Call the Gemini API to generate a daily or weekly plan.
 Uses the google-genai SDK (replaces deprecated google-generativeai).
+
+Responses are cached in the local store (see store.py), keyed by a hash
+of everything sent to the model, so re-running with identical inputs
+returns instantly without using API quota.
+
+Once a static system prompt reaches Gemini's minimum cacheable size, it is
+uploaded to Gemini's context cache and referenced by name, rather than
+re-sent with every request.
 """
 
+import hashlib
+import json
 import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+
 from google import genai
-from google.genai import types
+from google.genai import errors, types
+
+import store
+from notion_tasks import format_tasks_for_prompt
+from spans import count, span
+from task_matcher import TaskMatcher
+from usage import log_usage, token_counts
+
+MODEL = "gemini-2.0-flash"
+MAX_OUTPUT_TOKENS = 2048
+
+# Cached responses expire after a day; the cache is capped at ~5 MB
+RESPONSE_CACHE_TTL = 24 * 60 * 60
+RESPONSE_CACHE_MAX_BYTES = 5 * 1024 * 1024
+
+# Lifetime of a system prompt in Gemini's context cache; a cache with less
+# than CONTEXT_CACHE_MARGIN left is replaced rather than used
+CONTEXT_CACHE_TTL = 60 * 60
+CONTEXT_CACHE_MARGIN = 5 * 60
+# Gemini refuses to cache fewer tokens than this for MODEL
+CONTEXT_CACHE_MIN_TOKENS = 4096
+_context_cache_lock = threading.Lock()
+
+# One client per process, so its connection pool outlives a single plan
+_client = None
+_client_lock = threading.Lock()
 
 _SHARED_PRINCIPLES = """
 CALENDAR EVENTS ARE IMMUTABLE. Every calendar event must appear in the schedule exactly as given,
@@ -104,92 +144,297 @@ def build_tag_lookup(tasks: dict) -> dict[str, str]:
     return lookup
 
 
+def _reinsert_tag(line: str, matcher: TaskMatcher) -> str:
+    # Only process checkbox task lines
+    if line.strip().startswith("- [ ]") and "—" in line:
+        after_dash = line.split("—", 1)[1].strip()
+        # Check if a project tag is already present
+        if not after_dash.startswith("["):
+            # Strip trailing metadata like "(priority: ...)" for matching
+            clean = after_dash.lower().split("(priority:")[0].strip()
+            tag = matcher.match(clean)
+            if tag:
+                # Re-insert the tag
+                prefix, rest = line.split("—", 1)
+                line = f"{prefix}— {tag} {rest.strip()}"
+    return line
+
+
 def reinsert_project_tags(plan_text: str, tag_lookup: dict[str, str]) -> str:
     """
     Scan each scheduled task line and re-insert the project tag if Gemini dropped it.
-    Matches task text fuzzily (checks if the known task text appears in the line).
+    The longest known task text appearing in the line decides the tag; failing
+    that, a task whose text contains the line (see task_matcher.TaskMatcher).
     """
     if not tag_lookup:
         return plan_text
 
-    lines = plan_text.splitlines()
-    result = []
-    for line in lines:
-        # Only process checkbox task lines
-        if line.strip().startswith("- [ ]") and "—" in line:
-            after_dash = line.split("—", 1)[1].strip()
-            # Check if a project tag is already present
-            if not after_dash.startswith("["):
-                # Try to match against known tasks
-                after_lower = after_dash.lower()
-                # Strip trailing metadata like "(priority: ...)" for matching
-                clean = after_lower.split("(priority:")[0].strip()
-                for task_text, tag in tag_lookup.items():
-                    if task_text in clean or clean in task_text:
-                        # Re-insert the tag
-                        prefix, rest = line.split("—", 1)
-                        line = f"{prefix}— {tag} {rest.strip()}"
-                        break
-        result.append(line)
-    return "\n".join(result)
+    matcher = TaskMatcher(tag_lookup)
+    return "\n".join(_reinsert_tag(line, matcher) for line in plan_text.splitlines())
+
+
+def complete_lines(chunks: Iterable[str], tag_lookup: dict[str, str]) -> Iterator[str]:
+    """
+    Regroup streamed text chunks into whole lines, re-inserting project tags
+    on each line as soon as it is complete.
+    """
+    matcher = TaskMatcher(tag_lookup)
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield _reinsert_tag(line, matcher)
+    if buffer:
+        yield _reinsert_tag(buffer, matcher)
 
 
 def get_client() -> genai.Client:
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY not set in environment")
-    return genai.Client(api_key=api_key)
+    global _client
+    with _client_lock:
+        if _client is None:
+            api_key = os.environ.get("GEMINI_API_KEY")
+            if not api_key:
+                raise ValueError("GEMINI_API_KEY not set in environment")
+            _client = genai.Client(api_key=api_key)
+    return _client
 
 
-def generate_weekly_plan(
-    tasks_text: str,
-    events_text: str,
-    week_label: str,
-    working_hours: str,
-    tasks: dict | None = None,
+def prompt_fingerprint(model: str, system_prompt: str, user_message: str, config: dict) -> str:
+    """Return a stable hash of everything that determines the model's response."""
+    payload = json.dumps([model, system_prompt, user_message, config], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _config() -> dict:
+    return {"max_output_tokens": MAX_OUTPUT_TOKENS}
+
+
+def _context_cache_key(system_prompt: str) -> str:
+    return "gemini-context:" + prompt_fingerprint(MODEL, system_prompt, "", {})
+
+
+def cached_system_prompt(client: genai.Client, system_prompt: str) -> str | None:
+    """
+    Return the name of a Gemini context cache holding *system_prompt*,
+    creating one (with CONTEXT_CACHE_TTL) if there is no live one recorded
+    in the store. Returns None, and the prompt is sent inline, if the prompt
+    is below CONTEXT_CACHE_MIN_TOKENS or creation fails. A recorded cache is
+    only reused with CONTEXT_CACHE_MARGIN to spare, so it can't expire
+    mid-request.
+    """
+    if not _cacheable(system_prompt):
+        return None
+
+    key = _context_cache_key(system_prompt)
+    with _context_cache_lock:
+        raw = store.get_state(key)
+        if raw:
+            entry = json.loads(raw)
+            if entry["expires"] - time.time() > CONTEXT_CACHE_MARGIN:
+                return entry["name"]
+
+        try:
+            cache = client.caches.create(
+                model=MODEL,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=system_prompt,
+                    ttl=f"{CONTEXT_CACHE_TTL}s",
+                    display_name="nexttask system prompt",
+                ),
+            )
+        except errors.APIError:
+            return None
+        store.set_state(key, json.dumps({"name": cache.name, "expires": time.time() + CONTEXT_CACHE_TTL}))
+        return cache.name
+
+
+def _cacheable(system_prompt: str) -> bool:
+    """Whether *system_prompt* reaches CONTEXT_CACHE_MIN_TOKENS. Prompts with
+    fewer characters than that can't; longer ones are counted once and the
+    count kept in the store."""
+    if len(system_prompt) < CONTEXT_CACHE_MIN_TOKENS:
+        return False
+    key = "gemini-tokens:" + prompt_fingerprint(MODEL, system_prompt, "", {})
+    tokens = store.get_state(key)
+    if tokens is None:
+        tokens = count_tokens(system_prompt)
+        store.set_state(key, str(tokens))
+    return int(tokens) >= CONTEXT_CACHE_MIN_TOKENS
+
+
+def _generation_config(client: genai.Client, system_prompt: str, config: dict) -> types.GenerateContentConfig:
+    name = cached_system_prompt(client, system_prompt)
+    if name:
+        return types.GenerateContentConfig(cached_content=name, **config)
+    return types.GenerateContentConfig(system_instruction=system_prompt, **config)
+
+
+def generate(
+    system_prompt: str,
+    user_message: str,
+    use_cache: bool = True,
+    mode: str = "other",
+    task_count: int | None = None,
 ) -> str:
-    client = get_client()
+    """
+    Send one prompt to Gemini and return the response text.
+    With *use_cache*, an identical earlier prompt is answered from the
+    local response cache instead. Calls that reach Gemini are logged to the
+    usage log under *mode*, with *task_count* tasks in the prompt.
+    """
+    config = _config()
+    key = prompt_fingerprint(MODEL, system_prompt, user_message, config)
+    with span("gemini", model=MODEL) as record:
+        if use_cache:
+            cached = store.get_response(key, RESPONSE_CACHE_TTL)
+            record["cached"] = cached is not None
+            if cached is not None:
+                return cached
+
+        client = get_client()
+        gen_config = _generation_config(client, system_prompt, config)
+        started = time.perf_counter()
+        count("requests")
+        response = client.models.generate_content(model=MODEL, contents=user_message, config=gen_config)
+        text = response.text
+        count("bytes", len(text.encode()))
+        tokens = token_counts(response.usage_metadata)
+        record.update(tokens)
+        log_usage({
+            "mode": mode,
+            "model": MODEL,
+            "stream": False,
+            "tasks": task_count,
+            "prompt_chars": len(user_message),
+            **tokens,
+            "latency_ms": round((time.perf_counter() - started) * 1000),
+        })
+        store.put_response(key, text, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_BYTES)
+        return text
+
+
+def generate_stream(
+    system_prompt: str,
+    user_message: str,
+    use_cache: bool = True,
+    mode: str = "other",
+    task_count: int | None = None,
+) -> Iterator[str]:
+    """
+    Like generate, but yield the response in chunks as Gemini produces them.
+    A cached response is yielded whole; a fresh one is cached once complete.
+    The usage log also gets the time to the first chunk.
+    """
+    config = _config()
+    key = prompt_fingerprint(MODEL, system_prompt, user_message, config)
+    with span("gemini", model=MODEL, stream=True) as record:
+        if use_cache:
+            cached = store.get_response(key, RESPONSE_CACHE_TTL)
+            record["cached"] = cached is not None
+            if cached is not None:
+                yield cached
+                return
+
+        client = get_client()
+        chunks = []
+        usage_metadata = None
+        first_chunk_ms = None
+        gen_config = _generation_config(client, system_prompt, config)
+        started = time.perf_counter()
+        count("requests")
+        for chunk in client.models.generate_content_stream(model=MODEL, contents=user_message, config=gen_config):
+            # Token counts are complete on the last chunk
+            usage_metadata = chunk.usage_metadata or usage_metadata
+            if chunk.text:
+                if first_chunk_ms is None:
+                    first_chunk_ms = round((time.perf_counter() - started) * 1000)
+                count("bytes", len(chunk.text.encode()))
+                chunks.append(chunk.text)
+                yield chunk.text
+        tokens = token_counts(usage_metadata)
+        record.update(tokens)
+        log_usage({
+            "mode": mode,
+            "model": MODEL,
+            "stream": True,
+            "tasks": task_count,
+            "prompt_chars": len(user_message),
+            **tokens,
+            "latency_ms": round((time.perf_counter() - started) * 1000),
+            "first_chunk_ms": first_chunk_ms,
+        })
+        store.put_response(key, "".join(chunks), RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_BYTES)
+
+
+def _task_count(tasks: dict | None) -> int | None:
+    return len(tasks.get("actionable", [])) + len(tasks.get("pending", [])) if tasks else None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Tokens *text* takes up in a prompt to MODEL, as counted by Gemini.
+    If the count fails, falls back to a rough four characters per token.
+    """
+    count("requests")
+    try:
+        return get_client().models.count_tokens(model=MODEL, contents=text).total_tokens
+    except errors.APIError as err:
+        print(f"  Token count failed ({err.code} {err.status}); estimating instead.")
+        return len(text) // 4
+
+
+def select_tasks(tasks: dict, max_tasks: int | None = None, token_budget: int | None = None) -> tuple[dict, str]:
+    """
+    Choose the tasks to list in a prompt and format them.
 
-    user_message = WEEKLY_USER_TEMPLATE.format(
+    *tasks* must already be ranked best first. The first *max_tasks*
+    actionable and pending tasks are listed in full and the rest summarised
+    in one line each. If the list comes to more than *token_budget* tokens,
+    fewer tasks are listed until it fits. Returns the listed tasks, in the
+    same form as *tasks*, and the prompt text.
+    """
+    limit = max(len(tasks.get("actionable", [])), len(tasks.get("pending", [])))
+    if max_tasks:
+        limit = min(limit, max_tasks)
+    while True:
+        selected = {kind: tasks.get(kind, [])[:limit] for kind in ("actionable", "pending")}
+        omitted = {kind: tasks.get(kind, [])[limit:] for kind in ("actionable", "pending")}
+        tasks_text = format_tasks_for_prompt(selected, omitted)
+        # No token is shorter than a character, so short lists needn't be counted
+        if not token_budget or limit <= 1 or len(tasks_text) <= token_budget:
+            return selected, tasks_text
+        tokens = count_tokens(tasks_text)
+        if tokens <= token_budget:
+            return selected, tasks_text
+        # Shrink in proportion to the overshoot, with some headroom for the summary lines
+        limit = max(1, min(limit - 1, int(limit * token_budget / tokens * 0.9)))
+
+
+def weekly_user_message(tasks_text: str, events_text: str, week_label: str, working_hours: str) -> str:
+    return WEEKLY_USER_TEMPLATE.format(
         week_label=week_label,
         working_hours=working_hours,
         tasks=tasks_text,
         events=events_text,
     )
 
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=user_message,
-        config=types.GenerateContentConfig(
-            system_instruction=WEEKLY_SYSTEM_PROMPT,
-            max_output_tokens=2048,
-        ),
-    )
-    plan = response.text
-    if tasks:
-        plan = reinsert_project_tags(plan, build_tag_lookup(tasks))
-    return plan
-
 
-def generate_daily_plan(
+def daily_user_message(
     tasks_text: str,
     events_text: str,
     day_label: str,
     arrive: str,
     leave: str,
     week_plan_path: str | None = None,
-    tasks: dict | None = None,
 ) -> str:
-    client = get_client()
-
     week_context = ""
     if week_plan_path:
-        from pathlib import Path
         path = Path(week_plan_path)
         if path.exists():
             week_context = f"For context, here is my existing week plan:\n\n{path.read_text()}"
 
-    user_message = DAILY_USER_TEMPLATE.format(
+    return DAILY_USER_TEMPLATE.format(
         day_label=day_label,
         arrive=arrive,
         leave=leave,
@@ -198,15 +443,70 @@ def generate_daily_plan(
         week_context=week_context,
     )
 
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=user_message,
-        config=types.GenerateContentConfig(
-            system_instruction=DAILY_SYSTEM_PROMPT,
-            max_output_tokens=2048,
-        ),
+
+def generate_weekly_plan(
+    tasks_text: str,
+    events_text: str,
+    week_label: str,
+    working_hours: str,
+    tasks: dict | None = None,
+    use_cache: bool = True,
+) -> str:
+    user_message = weekly_user_message(tasks_text, events_text, week_label, working_hours)
+    plan = generate(WEEKLY_SYSTEM_PROMPT, user_message, use_cache=use_cache, mode="week", task_count=_task_count(tasks))
+    if tasks:
+        with span("post-process"):
+            plan = reinsert_project_tags(plan, build_tag_lookup(tasks))
+    return plan
+
+
+def stream_weekly_plan(
+    tasks_text: str,
+    events_text: str,
+    week_label: str,
+    working_hours: str,
+    tasks: dict | None = None,
+    use_cache: bool = True,
+) -> Iterator[str]:
+    """Yield the weekly plan line by line while Gemini is still writing it."""
+    user_message = weekly_user_message(tasks_text, events_text, week_label, working_hours)
+    chunks = generate_stream(
+        WEEKLY_SYSTEM_PROMPT, user_message, use_cache=use_cache, mode="week", task_count=_task_count(tasks)
     )
-    plan = response.text
+    yield from complete_lines(chunks, build_tag_lookup(tasks) if tasks else {})
+
+
+def generate_daily_plan(
+    tasks_text: str,
+    events_text: str,
+    day_label: str,
+    arrive: str,
+    leave: str,
+    week_plan_path: str | None = None,
+    tasks: dict | None = None,
+    use_cache: bool = True,
+) -> str:
+    user_message = daily_user_message(tasks_text, events_text, day_label, arrive, leave, week_plan_path)
+    plan = generate(DAILY_SYSTEM_PROMPT, user_message, use_cache=use_cache, mode="day", task_count=_task_count(tasks))
     if tasks:
-        plan = reinsert_project_tags(plan, build_tag_lookup(tasks))
+        with span("post-process"):
+            plan = reinsert_project_tags(plan, build_tag_lookup(tasks))
     return plan
+
+
+def stream_daily_plan(
+    tasks_text: str,
+    events_text: str,
+    day_label: str,
+    arrive: str,
+    leave: str,
+    week_plan_path: str | None = None,
+    tasks: dict | None = None,
+    use_cache: bool = True,
+) -> Iterator[str]:
+    """Yield the daily plan line by line while Gemini is still writing it."""
+    user_message = daily_user_message(tasks_text, events_text, day_label, arrive, leave, week_plan_path)
+    chunks = generate_stream(
+        DAILY_SYSTEM_PROMPT, user_message, use_cache=use_cache, mode="day", task_count=_task_count(tasks)
+    )
+    yield from complete_lines(chunks, build_tag_lookup(tasks) if tasks else {})
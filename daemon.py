@@ -0,0 +1,150 @@
+"""
+Long-running nexttask server, started with `python plan.py serve`.
+
+Keeps the Notion client, Calendar service and Gemini client alive between
+requests, and syncs tasks and calendar events into the local store in the
+background. Requests arrive from plan_client.py over a Unix domain socket
+and run plan.py's normal modes against the store (as with --offline), so
+`next` answers without any network round trip and `day`/`week` only wait
+for Gemini.
+
+Protocol: the client sends one JSON line, {"argv": [...], "cwd": "..."}.
+The server streams back the command's output as it is printed, then a NUL
+byte and the exit status, and closes the connection.
+"""
+
+import contextlib
+import json
+import os
+import socket
+import sys
+import threading
+import traceback
+from pathlib import Path
+
+SOCKET_PATH = Path(__file__).parent / "nexttask.sock"
+
+# Held while syncing or answering a request. Requests run one at a time:
+# each changes directory and redirects stdout, and the Calendar service
+# (httplib2 underneath) must not be used from two threads at once.
+_lock = threading.Lock()
+
+
+def refresh(full_sync: bool = False) -> None:
+    """Sync tasks and the calendar event cache into the local store."""
+    from notion_tasks import get_todo_tasks
+    from gcal_events import EventWindow, get_next_two_weeks_bounds
+
+    get_todo_tasks(full_sync=full_sync)
+    # Any range inside the cache span brings the whole span up to date
+    EventWindow([get_next_two_weeks_bounds()]).fetch(full_sync=full_sync)
+
+
+def _refresh_loop(interval: float, stop: threading.Event) -> None:
+    while not stop.wait(interval):
+        with _lock:
+            try:
+                refresh()
+            except Exception:
+                # A failed sync (e.g. no network) leaves the last good data in place.
+                # Printed under the lock, while no request has stderr redirected
+                traceback.print_exc()
+
+
+def run(argv: list[str], cwd: str, out) -> int:
+    """Run a plan.py command line from *cwd*, printing to *out*; return its exit status."""
+    import plan
+
+    if argv and argv[0] == "serve":
+        print("Already serving.", file=out)
+        return 1
+    # stats only reads the usage log and has no --offline option
+    if "--offline" not in argv and argv[:1] != ["stats"]:
+        argv = argv + ["--offline"]
+
+    previous_cwd = os.getcwd()
+    try:
+        os.chdir(cwd)
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+            if "--full-sync" in argv:
+                refresh(full_sync=True)
+            plan.main(argv)
+        return 0
+    except SystemExit as exit:
+        if exit.code is None:
+            return 0
+        return exit.code if isinstance(exit.code, int) else 1
+    except Exception:
+        traceback.print_exc(file=out)
+        return 1
+    finally:
+        os.chdir(previous_cwd)
+
+
+def handle(conn: socket.socket) -> None:
+    """Answer one client connection."""
+    with conn, conn.makefile("rb") as reader, conn.makefile("w", encoding="utf-8", buffering=1) as out:
+        # Don't let a client that never sends its request block the server
+        conn.settimeout(10)
+        request = json.loads(reader.readline())
+        conn.settimeout(None)
+        argv = request.get("argv") if isinstance(request, dict) else None
+        cwd = request.get("cwd") if isinstance(request, dict) else None
+        if not (isinstance(argv, list) and all(isinstance(arg, str) for arg in argv) and isinstance(cwd, str)):
+            raise ValueError(f"Malformed request: {request!r}")
+        status = run(argv, cwd, out)
+        out.write(f"\0{status}\n")
+
+
+def serve(socket_path: Path = SOCKET_PATH, refresh_minutes: float = 5) -> None:
+    """Warm up the API clients, then answer requests on *socket_path* until interrupted."""
+    if socket_path.exists():
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(socket_path))
+        except ConnectionRefusedError:
+            # Left behind by a server that didn't shut down cleanly
+            socket_path.unlink()
+        else:
+            print(f"nexttask is already being served on {socket_path}.")
+            sys.exit(1)
+        finally:
+            probe.close()
+
+    print("Connecting to Notion, Google Calendar and Gemini, and syncing tasks and events...")
+    from notion_tasks import get_notion_client
+    from gcal_events import get_calendar_service
+
+    get_notion_client()
+    get_calendar_service()
+    if os.environ.get("GEMINI_API_KEY"):
+        from claude_planner import get_client
+
+        get_client()
+    with _lock:
+        refresh()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(socket_path))
+    os.chmod(socket_path, 0o600)
+    server.listen()
+
+    stop = threading.Event()
+    threading.Thread(target=_refresh_loop, args=(refresh_minutes * 60, stop), daemon=True).start()
+    print(f"Serving on {socket_path}, syncing every {refresh_minutes:g} minutes. Press Ctrl-C to stop.")
+    try:
+        while True:
+            conn, _ = server.accept()
+            with _lock:
+                try:
+                    handle(conn)
+                except Exception:
+                    # Client went away, sent a malformed request, or hit a bug:
+                    # log it and carry on serving
+                    traceback.print_exc()
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        stop.set()
+        server.close()
+        socket_path.unlink(missing_ok=True)
@@ -0,0 +1,146 @@
+"""
+Free/busy intervals for one working day.
+
+Times are minutes since midnight (local wall-clock time). Busy intervals
+are kept sorted and merged, and the free gaps between them are indexed
+for bisect lookup, so queries like "which gap am I in" or "when is the
+next meeting" don't rescan the day's events.
+"""
+
+import datetime
+from bisect import bisect_right
+from typing import Iterable
+
+
+def minutes(t: datetime.time) -> int:
+    return t.hour * 60 + t.minute
+
+
+def clock(m: int) -> str:
+    return f"{m // 60:02d}:{m % 60:02d}"
+
+
+def event_minutes(event: dict) -> tuple[int, int]:
+    """Start and end of a timed event in minutes since midnight on its start day."""
+    # Normalise to local naive time for comparison
+    start = datetime.datetime.fromisoformat(event["start"]).replace(tzinfo=None)
+    end = datetime.datetime.fromisoformat(event["end"]).replace(tzinfo=None)
+    end_minutes = minutes(end.time()) if end.date() == start.date() else 24 * 60
+    return minutes(start.time()), end_minutes
+
+
+def starts_on(event: dict, date: datetime.date) -> bool:
+    """Whether a timed event starts on *date*, in its own offset's local time."""
+    return datetime.datetime.fromisoformat(event["start"]).date() == date
+
+
+class FreeTime:
+    """
+    Free time between *start* and *end* (minutes since midnight) around a
+    set of busy intervals. Busy time outside the window is ignored.
+    """
+
+    def __init__(self, start: int, end: int, busy: Iterable[tuple[int, int]] = ()):
+        self.start = start
+        self.end = end
+        self.busy: list[tuple[int, int]] = []
+        for interval in busy:
+            self._add_busy(*interval)
+        self._index()
+
+    @classmethod
+    def from_events(
+        cls,
+        events: list[dict],
+        date: datetime.date,
+        start: datetime.time,
+        end: datetime.time,
+    ) -> "FreeTime":
+        """Build from fetch_events output, keeping timed events that start on *date*."""
+        busy = []
+        for ev in events:
+            if ev["all_day"]:
+                continue
+            if not starts_on(ev, date):
+                continue
+            busy.append(event_minutes(ev))
+        return cls(minutes(start), minutes(end), busy)
+
+    @classmethod
+    def from_intervals(
+        cls,
+        intervals: list[tuple[datetime.datetime, datetime.datetime]],
+        date: datetime.date,
+        start: datetime.time,
+        end: datetime.time,
+    ) -> "FreeTime":
+        """Build from aware (start, end) datetimes, e.g. get_busy_intervals
+        output, converted to local time and clipped to *date*."""
+        busy = []
+        for busy_start, busy_end in intervals:
+            busy_start, busy_end = busy_start.astimezone(), busy_end.astimezone()
+            if busy_end.date() < date or busy_start.date() > date:
+                continue
+            busy.append((
+                minutes(busy_start.time()) if busy_start.date() == date else 0,
+                minutes(busy_end.time()) if busy_end.date() == date else 24 * 60,
+            ))
+        return cls(minutes(start), minutes(end), busy)
+
+    def _add_busy(self, start: int, end: int) -> None:
+        start, end = max(start, self.start), min(end, self.end)
+        if start >= end:
+            return
+        merged = []
+        for busy_start, busy_end in self.busy:
+            if busy_end < start or busy_start > end:
+                merged.append((busy_start, busy_end))
+            else:
+                start, end = min(start, busy_start), max(end, busy_end)
+        merged.append((start, end))
+        merged.sort()
+        self.busy = merged
+
+    def _index(self) -> None:
+        gaps = []
+        cursor = self.start
+        for busy_start, busy_end in self.busy:
+            if busy_start > cursor:
+                gaps.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+        if cursor < self.end:
+            gaps.append((cursor, self.end))
+        self._gaps = gaps
+        self._gap_starts = [g[0] for g in gaps]
+        self._busy_starts = [b[0] for b in self.busy]
+
+    def reserve(self, start: int, end: int) -> None:
+        """Mark [start, end) as busy."""
+        self._add_busy(start, end)
+        self._index()
+
+    def gaps(self, min_minutes: int = 1) -> list[tuple[int, int]]:
+        """All free gaps of at least *min_minutes*, earliest first."""
+        return [g for g in self._gaps if g[1] - g[0] >= min_minutes]
+
+    def longest(self) -> tuple[int, int] | None:
+        """The longest free gap (earliest if tied), or None if the day is full."""
+        return max(self._gaps, key=lambda g: g[1] - g[0], default=None)
+
+    def gap_at(self, t: int) -> tuple[int, int] | None:
+        """The free gap containing *t*, or None if *t* is busy or outside the window."""
+        i = bisect_right(self._gap_starts, t) - 1
+        if i >= 0 and t < self._gaps[i][1]:
+            return self._gaps[i]
+        return None
+
+    def next_busy(self, t: int) -> tuple[int, int] | None:
+        """The first busy interval starting at or after *t*."""
+        i = bisect_right(self._busy_starts, t - 1)
+        return self.busy[i] if i < len(self.busy) else None
+
+    def free_minutes(self, after: int | None = None) -> int:
+        """Free minutes left in the window from *after* (default: the window start)."""
+        after = self.start if after is None else after
+        first = max(0, bisect_right(self._gap_starts, after) - 1)
+        return sum(max(0, end - max(start, after)) for start, end in self._gaps[first:])
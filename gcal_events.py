@@ -3,29 +3,67 @@ Fetch events from Google Calendar for today or the current week.
 
 First run will open a browser for OAuth2 authorisation and save a token
 to token.json. Subsequent runs reuse the saved token.
+
+Events from a week ago to two months ahead are cached in the local store
+(see store.py) and kept current with the Calendar API's incremental sync
+tokens, so repeat runs only transfer events that changed.
+
+GOOGLE_CALENDAR_ID may list several calendars, comma-separated; their
+requests go out together in one HTTP batch and the events are merged.
 """
 
 import os
+import json
 import datetime
+import threading
 from pathlib import Path
+from typing import Iterable
 
-from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+
+import store
+from spans import count, span
+
+# googleapiclient and google_auth_oauthlib are imported where they are
+# used: the OAuth flow is only needed on first run, and neither is needed
+# just to format events.
 
 SCOPES = ["https://www.googleapis.com/auth/calendar.readonly"]
 TOKEN_PATH = Path(__file__).parent / "token.json"
 CREDENTIALS_PATH = Path(__file__).parent / "credentials.json"
 
+# Span of the local event cache, relative to today. Queries reaching
+# outside it go straight to the API.
+CACHE_PAST_DAYS = 7
+CACHE_FUTURE_DAYS = 60
 
-def get_calendar_service():
+# Partial response: only the event fields we read. Attendee lists,
+# descriptions and conference data are left out of the payload.
+LIST_FIELDS = "nextPageToken,nextSyncToken,items(id,status,summary,start,end)"
+
+# Events per events().list page (the API allows up to 2500)
+PAGE_SIZE = 250
+
+# Most calls the Calendar API accepts in one batch request
+BATCH_LIMIT = 50
+
+# Calendar queries may run in parallel threads; only one of them should
+# refresh the token (or open the browser flow) and write token.json.
+_auth_lock = threading.Lock()
+
+# Built once per process by get_calendar_service
+_service = None
+
+
+def load_credentials() -> Credentials:
+    """Load token.json, refreshing it or running the browser flow if needed."""
     creds = None
     if TOKEN_PATH.exists():
         creds = Credentials.from_authorized_user_file(str(TOKEN_PATH), SCOPES)
 
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
+            from google.auth.transport.requests import Request
             creds.refresh(Request())
         else:
             if not CREDENTIALS_PATH.exists():
@@ -33,12 +71,37 @@ def get_calendar_service():
                     f"credentials.json not found at {CREDENTIALS_PATH}\n"
                     "Download it from Google Cloud Console > APIs & Services > Credentials"
                 )
+            from google_auth_oauthlib.flow import InstalledAppFlow
             flow = InstalledAppFlow.from_client_secrets_file(str(CREDENTIALS_PATH), SCOPES)
             creds = flow.run_local_server(port=0)
         with open(TOKEN_PATH, "w") as f:
             f.write(creds.to_json())
+    return creds
+
 
-    return build("calendar", "v3", credentials=creds)
+def build_service(creds: Credentials):
+    """Build a Calendar client from the discovery document bundled with
+    google-api-python-client, so construction never touches the network."""
+    from googleapiclient.discovery import build
+    return build("calendar", "v3", credentials=creds, static_discovery=True, cache_discovery=False)
+
+
+def get_calendar_service():
+    """
+    Return the process-wide Calendar service, building it on first use.
+
+    The credentials inside refresh themselves when the access token
+    expires, so token.json is only read (and rewritten) once per process.
+    The underlying httplib2 connection is not thread-safe: share the
+    service within one thread, or batch requests through it.
+    """
+    global _service
+    with _auth_lock:
+        if _service is None:
+            # Includes refreshing an expired OAuth token
+            with span("calendar client setup"):
+                _service = build_service(load_credentials())
+    return _service
 
 
 def get_week_bounds(monday: datetime.date | None = None) -> tuple[datetime.datetime, datetime.datetime]:
@@ -64,52 +127,425 @@ def get_day_bounds(date: datetime.date | None = None) -> tuple[datetime.datetime
     return start, end
 
 
-def fetch_events(time_min: datetime.datetime, time_max: datetime.datetime) -> list[dict]:
-    calendar_id = os.environ.get("GOOGLE_CALENDAR_ID", "primary")
-    service = get_calendar_service()
+def _normalise_event(item: dict) -> dict:
+    start = item["start"].get("dateTime", item["start"].get("date"))
+    end = item["end"].get("dateTime", item["end"].get("date"))
+    return {
+        "id": item.get("id"),
+        "summary": item.get("summary", "(no title)"),
+        "start": start,
+        "end": end,
+        "all_day": "dateTime" not in item["start"],
+    }
+
+
+def calendar_ids() -> list[str]:
+    """Calendars to read: GOOGLE_CALENDAR_ID, a comma-separated list (default: primary)."""
+    ids = [cid.strip() for cid in os.environ.get("GOOGLE_CALENDAR_ID", "primary").split(",")]
+    return [cid for cid in ids if cid] or ["primary"]
+
+
+def _counted(request, round_trip: bool = True):
+    """Make *request* count its response size (and, if it is its own HTTP
+    round trip, one request) in the current span when it completes."""
+    postproc = request.postproc
+
+    def tally(resp, content):
+        count("requests", round_trip)
+        count("bytes", len(content))
+        return postproc(resp, content)
+
+    request.postproc = tally
+    return request
+
+
+def execute(request):
+    """Execute an API request, counting it and its response size in the current span."""
+    return _counted(request).execute()
+
+
+def execute_batch(service, requests: list) -> list:
+    """
+    Execute several API requests in one HTTP batch round trip (BATCH_LIMIT
+    per batch). Returns each request's response in order, or the HttpError
+    it raised — one failed calendar doesn't lose the others' results.
+    """
+    from googleapiclient.errors import HttpError
+
+    if len(requests) == 1:
+        try:
+            return [execute(requests[0])]
+        except HttpError as err:
+            return [err]
+
+    results = [None] * len(requests)
+
+    def callback(request_id, response, exception):
+        results[int(request_id)] = exception if exception is not None else response
+
+    for offset in range(0, len(requests), BATCH_LIMIT):
+        batch = service.new_batch_http_request(callback=callback)
+        for i, request in enumerate(requests[offset:offset + BATCH_LIMIT], start=offset):
+            batch.add(_counted(request, round_trip=False), request_id=str(i))
+        batch.execute()
+        count("requests")
+    return results
+
+
+def list_pages(service, page_size: int = PAGE_SIZE, **kwargs) -> list[dict]:
+    """Run events().list and return every response page, following
+    nextPageToken. The last page carries nextSyncToken."""
+    pages = []
+    while True:
+        page = execute(service.events().list(fields=LIST_FIELDS, maxResults=page_size, **kwargs))
+        pages.append(page)
+        if not page.get("nextPageToken"):
+            return pages
+        kwargs["pageToken"] = page["nextPageToken"]
+
+
+def list_pages_batched(service, queries: list[dict], page_size: int = PAGE_SIZE) -> list:
+    """
+    list_pages for several events().list queries at once. The first page of
+    every query is fetched in a single HTTP batch; each query then follows
+    its own nextPageToken. Returns every query's pages, or the HttpError its
+    first page raised.
+    """
+    first_pages = execute_batch(
+        service,
+        [service.events().list(fields=LIST_FIELDS, maxResults=page_size, **kwargs) for kwargs in queries],
+    )
+    results = []
+    for kwargs, page in zip(queries, first_pages):
+        if isinstance(page, Exception):
+            results.append(page)
+        elif page.get("nextPageToken"):
+            results.append([page] + list_pages(service, page_size, pageToken=page["nextPageToken"], **kwargs))
+        else:
+            results.append([page])
+    return results
+
+
+def _collect(pages: list[dict]) -> tuple[list[dict], str | None]:
+    """Return (items, nextSyncToken) from a query's pages."""
+    items = []
+    for page in pages:
+        items.extend(page.get("items", []))
+    return items, pages[-1].get("nextSyncToken")
+
+
+def _cache_span() -> tuple[datetime.datetime, datetime.datetime]:
+    today = datetime.date.today()
+    start, _ = get_day_bounds(today - datetime.timedelta(days=CACHE_PAST_DAYS))
+    end, _ = get_day_bounds(today + datetime.timedelta(days=CACHE_FUTURE_DAYS))
+    return start, end
+
+
+def unique_events(events: Iterable[dict]) -> list[dict]:
+    """Drop repeats of an event id, keeping the first. A meeting shared
+    between calendars, or straddling two queried spans, appears once."""
+    seen = set()
+    result = []
+    for ev in events:
+        if ev["id"] in seen:
+            continue
+        seen.add(ev["id"])
+        result.append(ev)
+    return result
+
+
+def sync_event_caches(
+    service,
+    calendars: list[str],
+    time_min: datetime.datetime,
+    time_max: datetime.datetime,
+) -> list[dict] | None:
+    """
+    Bring the cached events for each of *calendars* up to date and return
+    them all, merged.
+
+    Normally this sends each calendar's stored sync token, so only events
+    changed or cancelled since the last run are transferred. A full sync
+    over the cache span (today -CACHE_PAST_DAYS to +CACHE_FUTURE_DAYS)
+    happens on first use or after reset_event_cache, when the stored span
+    no longer covers [time_min, time_max], or when Google invalidates the
+    token (HTTP 410 Gone). Either way, the calendars' requests go out
+    together in one HTTP batch.
 
-    result = service.events().list(
-        calendarId=calendar_id,
-        timeMin=time_min.isoformat(),
-        timeMax=time_max.isoformat(),
-        singleEvents=True,
-        orderBy="startTime",
-    ).execute()
+    Returns None if a full sync is needed and [time_min, time_max] lies
+    outside the cache span; the caller should then query the API directly.
+    """
+    from googleapiclient.errors import HttpError
+
+    states = {}
+    for calendar_id in calendars:
+        raw_state = store.get_state(f"gcal:{calendar_id}")
+        states[calendar_id] = json.loads(raw_state) if raw_state else None
+
+    incremental = [
+        calendar_id for calendar_id, state in states.items()
+        if state
+        and datetime.datetime.fromisoformat(state["time_min"]) <= time_min
+        and time_max <= datetime.datetime.fromisoformat(state["time_max"])
+    ]
+    results = list_pages_batched(service, [
+        {"calendarId": calendar_id, "singleEvents": True, "syncToken": states[calendar_id]["sync_token"]}
+        for calendar_id in incremental
+    ])
+
+    stale = [calendar_id for calendar_id in calendars if calendar_id not in incremental]
+    for calendar_id, pages in zip(incremental, results):
+        if isinstance(pages, HttpError):
+            if pages.resp.status != 410:
+                raise pages
+            count("retries")
+            stale.append(calendar_id)
+            continue
+        items, sync_token = _collect(pages)
+        upserts = {}
+        deletes = []
+        for item in items:
+            if item.get("status") == "cancelled":
+                deletes.append(item["id"])
+            else:
+                upserts[item["id"]] = _normalise_event(item)
+        state = states[calendar_id]
+        state["sync_token"] = sync_token
+        store.save_events(calendar_id, upserts, deletes, json.dumps(state))
+
+    if stale:
+        span_min, span_max = _cache_span()
+        if time_min < span_min or time_max > span_max:
+            return None
+
+        results = list_pages_batched(service, [
+            {
+                "calendarId": calendar_id,
+                "timeMin": span_min.isoformat(),
+                "timeMax": span_max.isoformat(),
+                "singleEvents": True,
+            }
+            for calendar_id in stale
+        ])
+        for calendar_id, pages in zip(stale, results):
+            if isinstance(pages, Exception):
+                raise pages
+            items, sync_token = _collect(pages)
+            events = {item["id"]: _normalise_event(item) for item in items}
+            state = {
+                "sync_token": sync_token,
+                "time_min": span_min.isoformat(),
+                "time_max": span_max.isoformat(),
+            }
+            store.save_events(calendar_id, events, [], json.dumps(state), replace=True)
+
+    return unique_events(ev for calendar_id in calendars for ev in store.load_events(calendar_id))
+
+
+def reset_event_cache(calendar_id: str | None = None) -> None:
+    """Drop cached events and the sync token (for every calendar in
+    GOOGLE_CALENDAR_ID by default) so the next fetch does a full sync."""
+    for cid in [calendar_id] if calendar_id else calendar_ids():
+        store.save_events(cid, {}, [], None, replace=True)
+
+
+def fetch_events(
+    time_min: datetime.datetime,
+    time_max: datetime.datetime,
+    service=None,
+) -> list[dict]:
+    """Events in [time_min, time_max] from every calendar, merged and sorted by start."""
+    service = service or get_calendar_service()
+
+    cached = sync_event_caches(service, calendar_ids(), time_min, time_max)
+    if cached is not None:
+        return overlapping(cached, time_min, time_max)
+
+    return list_events(time_min, time_max, service=service)
+
+
+def list_events(
+    time_min: datetime.datetime,
+    time_max: datetime.datetime,
+    service=None,
+    page_size: int = PAGE_SIZE,
+) -> list[dict]:
+    """
+    Normalised events in [time_min, time_max] from every calendar, straight
+    from the API, sorted by start. Bypasses the local cache.
+
+    The calendars' first pages arrive in one HTTP batch; a meeting on more
+    than one calendar appears once.
+    """
+    service = service or get_calendar_service()
 
     events = []
-    for item in result.get("items", []):
-        start = item["start"].get("dateTime", item["start"].get("date"))
-        end = item["end"].get("dateTime", item["end"].get("date"))
-        events.append({
-            "summary": item.get("summary", "(no title)"),
-            "start": start,
-            "end": end,
-            "all_day": "dateTime" not in item["start"],
-        })
-    return events
-
-
-def get_events_this_week(monday: datetime.date | None = None) -> list[dict]:
+    for pages in list_pages_batched(service, [
+        {
+            "calendarId": calendar_id,
+            "timeMin": time_min.isoformat(),
+            "timeMax": time_max.isoformat(),
+            "singleEvents": True,
+        }
+        for calendar_id in calendar_ids()
+    ], page_size=page_size):
+        if isinstance(pages, Exception):
+            raise pages
+        events.extend(_normalise_event(item) for item in _collect(pages)[0])
+    return unique_events(sorted(events, key=event_start))
+
+
+def get_busy_intervals(
+    time_min: datetime.datetime,
+    time_max: datetime.datetime,
+    service=None,
+    calendars: list[str] | None = None,
+) -> list[tuple[datetime.datetime, datetime.datetime]]:
+    """
+    Busy (start, end) intervals in [time_min, time_max] across *calendars*
+    (default: every calendar in GOOGLE_CALENDAR_ID), merged and sorted.
+
+    One small FreeBusy request answers for all calendars at once: no titles
+    or event resources, just the busy times. Events marked "free" and
+    declined invitations are not busy. Bypasses the local cache.
+    """
+    service = service or get_calendar_service()
+    calendars = calendars or calendar_ids()
+
+    response = execute(service.freebusy().query(
+        body={
+            "timeMin": time_min.isoformat(),
+            "timeMax": time_max.isoformat(),
+            "items": [{"id": calendar_id} for calendar_id in calendars],
+        },
+        fields="calendars",
+    ))
+    intervals = []
+    for calendar_id, result in response.get("calendars", {}).items():
+        if result.get("errors"):
+            reasons = ", ".join(err.get("reason", "unknown") for err in result["errors"])
+            raise RuntimeError(f"FreeBusy query failed for calendar {calendar_id}: {reasons}")
+        for busy in result.get("busy", []):
+            intervals.append((
+                datetime.datetime.fromisoformat(busy["start"]),
+                datetime.datetime.fromisoformat(busy["end"]),
+            ))
+    return merge_ranges(intervals)
+
+
+def event_start(event: dict) -> datetime.datetime:
+    """An event's start as an aware datetime (all-day dates at UTC midnight)."""
+    return event_bounds(event)[0]
+
+
+def event_bounds(event: dict) -> tuple[datetime.datetime, datetime.datetime]:
+    """Return an event's (start, end) as aware datetimes.
+    All-day dates are taken as UTC midnight, matching get_day_bounds."""
+    if event["all_day"]:
+        tz = datetime.timezone.utc
+        start = datetime.datetime.combine(datetime.date.fromisoformat(event["start"]), datetime.time.min, tzinfo=tz)
+        end = datetime.datetime.combine(datetime.date.fromisoformat(event["end"]), datetime.time.min, tzinfo=tz)
+        return start, end
+    return datetime.datetime.fromisoformat(event["start"]), datetime.datetime.fromisoformat(event["end"])
+
+
+def overlapping(events: list[dict], time_min: datetime.datetime, time_max: datetime.datetime) -> list[dict]:
+    """Events overlapping [time_min, time_max] sorted by start, like events().list with timeMin/timeMax."""
+    result = []
+    for ev in events:
+        ev_start, ev_end = event_bounds(ev)
+        if ev_end > time_min and ev_start < time_max:
+            result.append(ev)
+    result.sort(key=event_bounds)
+    return result
+
+
+def cached_events(time_min: datetime.datetime, time_max: datetime.datetime) -> list[dict]:
+    """Events in [time_min, time_max] from the local cache only, without syncing.
+    Anything outside the span of the last sync is simply missing."""
+    events = unique_events(ev for calendar_id in calendar_ids() for ev in store.load_events(calendar_id))
+    return overlapping(events, time_min, time_max)
+
+
+def merge_ranges(
+    ranges: list[tuple[datetime.datetime, datetime.datetime]],
+) -> list[tuple[datetime.datetime, datetime.datetime]]:
+    """Merge overlapping or touching (start, end) ranges into a sorted, disjoint list."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class EventWindow:
+    """
+    Calendar events for the union of every time range a run needs.
+
+    Collect the ranges, call fetch() once — one batched events().list per
+    disjoint span, covering every calendar, all through a single service —
+    then pass the window to get_events_today / get_events_this_week /
+    get_events_next_two_weeks, which slice it in memory instead of querying
+    again.
+    """
+
+    def __init__(self, ranges: list[tuple[datetime.datetime, datetime.datetime]]):
+        self.ranges = merge_ranges(ranges)
+        self.events: list[dict] = []
+
+    def fetch(self, full_sync: bool = False, offline: bool = False) -> list[dict]:
+        """Fetch every span. With *offline*, read the local cache without any network access."""
+        if full_sync and not offline:
+            reset_event_cache()
+        service = None if offline else get_calendar_service()
+        events = []
+        for start, end in self.ranges:
+            events.extend(cached_events(start, end) if offline else fetch_events(start, end, service=service))
+        # An event straddling two spans comes back from both queries
+        events = unique_events(events)
+        events.sort(key=event_bounds)
+        self.events = events
+        return events
+
+    def slice(self, start: datetime.datetime, end: datetime.datetime) -> list[dict]:
+        """Events overlapping [start, end], like events().list with timeMin/timeMax."""
+        return overlapping(self.events, start, end)
+
+
+def get_events_this_week(monday: datetime.date | None = None, window: EventWindow | None = None) -> list[dict]:
     start, end = get_week_bounds(monday)
+    if window is not None:
+        return window.slice(start, end)
     return fetch_events(start, end)
 
 
-def get_events_next_two_weeks() -> list[dict]:
-    """Return all events from now until 14 days ahead."""
+def get_next_two_weeks_bounds() -> tuple[datetime.datetime, datetime.datetime]:
+    """Return now and 14 days from now."""
     tz = datetime.timezone.utc
     start = datetime.datetime.now(tz=tz)
     end = start + datetime.timedelta(days=14)
+    return start, end
+
+
+def get_events_next_two_weeks(window: EventWindow | None = None) -> list[dict]:
+    """Return all events from now until 14 days ahead."""
+    start, end = get_next_two_weeks_bounds()
+    if window is not None:
+        return window.slice(start, end)
     return fetch_events(start, end)
 
 
-def get_events_today(date: datetime.date | None = None) -> list[dict]:
+def get_events_today(date: datetime.date | None = None, window: EventWindow | None = None) -> list[dict]:
     start, end = get_day_bounds(date)
+    if window is not None:
+        return window.slice(start, end)
     return fetch_events(start, end)
 
 
-def format_events_for_prompt(events: list[dict]) -> str:
-    if not events:
-        return "No calendar events."
+def format_events_for_prompt(events: Iterable[dict]) -> str:
+    """Format events one line each."""
     lines = []
     for ev in events:
         if ev["all_day"]:
@@ -124,4 +560,6 @@ def format_events_for_prompt(events: list[dict]) -> str:
             day = start_dt.strftime("%A")
             time_range = f"{start_dt.strftime('%H:%M')}–{end_dt.strftime('%H:%M')}"
             lines.append(f"- {day} {time_range}: {ev['summary']}")
+    if not lines:
+        return "No calendar events."
     return "\n".join(lines)
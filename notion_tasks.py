@@ -8,20 +8,81 @@ Expected database properties:
   - Priority (select)       — "high" | "medium" | "low"
   - Effort   (select)       — "high" | "medium" | "low" (cognitive difficulty)
   - Quick    (checkbox)     — if checked, task takes ~15 min regardless of effort
+
+Tasks are cached in the local store (see store.py). Each run only asks
+Notion for pages edited since the last sync; pass full_sync=True to
+re-download everything. Full syncs split the query into disjoint filters
+and run them concurrently with the async client.
+
+Queries ask Notion for only the properties listed above (filter_properties),
+using property ids looked up once and kept in the store.
 """
 
+import asyncio
+import json
 import os
-from notion_client import Client
+import threading
+import time
+from urllib.parse import unquote
+import httpx
+from notion_client import AsyncClient, Client
+
+import store
+from spans import count
 
 PRIORITY_ORDER = {"high": 0, "medium": 1, "low": 2}
 EFFORT_ORDER   = {"high": 0, "medium": 1, "low": 2}
 
+# Properties read by page_to_task; the title is found by type, not name
+TASK_PROPERTIES = ("Project", "Status", "Priority", "Effort", "Quick")
+
+# Full syncs follow up to MAX_CONCURRENT_QUERIES cursor chains at once, so
+# one chain's latency overlaps another's. Notion allows an average of three
+# requests a second per integration, so request starts across all chains are
+# also spaced to MAX_REQUESTS_PER_SECOND (None for no limit)
+MAX_CONCURRENT_QUERIES = 3
+MAX_REQUESTS_PER_SECOND = 3
+
+# Incremental queries never return deleted pages, so tasks deleted in Notion
+# are only dropped by a full sync; one runs at least this often
+FULL_SYNC_INTERVAL = 6 * 60 * 60
+
+# One client per process, so its connection pool outlives a single sync
+_client = None
+_client_lock = threading.Lock()
+
+
+def _count_response(response: httpx.Response) -> None:
+    count("requests")
+    count("bytes", len(response.read()))
+    # Rate-limited requests are retried by the client
+    if response.status_code == 429:
+        count("retries")
+
+
+async def _count_response_async(response: httpx.Response) -> None:
+    count("requests")
+    count("bytes", len(await response.aread()))
+    if response.status_code == 429:
+        count("retries")
+
 
 def get_notion_client() -> Client:
+    global _client
+    with _client_lock:
+        if _client is None:
+            token = os.environ.get("NOTION_TOKEN")
+            if not token:
+                raise ValueError("NOTION_TOKEN not set in environment")
+            _client = Client(auth=token, client=httpx.Client(event_hooks={"response": [_count_response]}))
+    return _client
+
+
+def get_async_notion_client() -> AsyncClient:
     token = os.environ.get("NOTION_TOKEN")
     if not token:
         raise ValueError("NOTION_TOKEN not set in environment")
-    return Client(auth=token)
+    return AsyncClient(auth=token, client=httpx.AsyncClient(event_hooks={"response": [_count_response_async]}))
 
 
 def extract_text(rich_text: list) -> str:
@@ -52,23 +113,62 @@ def get_title(props: dict) -> str:
     return ""
 
 
-def query_database(client: Client, database_id: str) -> list[dict]:
-    """Fetch all non-done pages from the database, handling pagination.
+def get_property_ids(client: Client, database_id: str, refresh: bool = False) -> list[str]:
+    """
+    Return the ids of the title and TASK_PROPERTIES, for filter_properties.
+    Looked up from the data source schema once and cached in the store;
+    *refresh* re-reads the schema (done on every full sync).
+    """
+    key = f"notion-schema:{database_id}"
+    cached = None if refresh else store.get_state(key)
+    if cached:
+        return json.loads(cached)
+
+    schema = client.data_sources.retrieve(data_source_id=database_id)["properties"]
+    # Ids come URL-encoded; the client encodes query parameters itself
+    ids = [unquote(prop["id"]) for name, prop in schema.items()
+           if prop.get("type") == "title" or name in TASK_PROPERTIES]
+    store.set_state(key, json.dumps(ids))
+    return ids
+
+
+def query_database(
+    client: Client,
+    database_id: str,
+    edited_after: str | None = None,
+    property_ids: list[str] | None = None,
+) -> list[dict]:
+    """Fetch pages from the database, handling pagination.
+
+    Without *edited_after*, returns all non-done pages (a full sync). With an
+    ISO timestamp, returns every page edited at or after it, whatever its
+    status, so that tasks moved to done can be dropped from the store.
+    With *property_ids*, pages carry only those properties.
 
     Uses client.data_sources.query — the notion-client v2 equivalent of
     the older client.databases.query.
     """
+    if edited_after:
+        query_filter = {
+            "timestamp": "last_edited_time",
+            "last_edited_time": {"on_or_after": edited_after},
+        }
+    else:
+        query_filter = {
+            "property": "Status",
+            "select": {"does_not_equal": "done"},
+        }
+
     pages = []
     cursor = None
 
     while True:
         kwargs = {
             "data_source_id": database_id,
-            "filter": {
-                "property": "Status",
-                "select": {"does_not_equal": "done"},
-            },
+            "filter": query_filter,
         }
+        if property_ids:
+            kwargs["filter_properties"] = property_ids
         if cursor:
             kwargs["start_cursor"] = cursor
 
@@ -82,7 +182,153 @@ def query_database(client: Client, database_id: str) -> list[dict]:
     return pages
 
 
-def get_todo_tasks(database_id: str | None = None) -> dict[str, list[dict]]:
+def _select_is(name: str, value: str) -> dict:
+    return {"property": name, "select": {"equals": value}}
+
+
+def _select_is_not(name: str, value: str) -> dict:
+    return {"property": name, "select": {"does_not_equal": value}}
+
+
+def partition_filters() -> list[dict]:
+    """
+    Split "Status is not done" into disjoint filters by Status and Priority.
+    Every non-done page matches exactly one of them, including pages with
+    an empty or unexpected Status or Priority.
+    """
+    statuses = [
+        [_select_is("Status", "actionable")],
+        [_select_is("Status", "pending")],
+        [_select_is_not("Status", s) for s in ("actionable", "pending", "done")],
+    ]
+    priorities = [[_select_is("Priority", p)] for p in PRIORITY_ORDER]
+    priorities.append([_select_is_not("Priority", p) for p in PRIORITY_ORDER])
+    return [{"and": status + priority} for status in statuses for priority in priorities]
+
+
+async def query_database_async(
+    client: AsyncClient,
+    database_id: str,
+    property_ids: list[str] | None = None,
+) -> list[dict]:
+    """Fetch all non-done pages by running partition_filters() concurrently,
+    within MAX_REQUESTS_PER_SECOND, then merge the results, de-duplicated
+    by page id."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_QUERIES)
+    loop = asyncio.get_running_loop()
+    next_start = loop.time()
+
+    async def wait_turn() -> None:
+        # Reserve the next free start slot; no await before the update, so
+        # chains can't claim the same slot
+        nonlocal next_start
+        if not MAX_REQUESTS_PER_SECOND:
+            return
+        now = loop.time()
+        start = max(now, next_start)
+        next_start = start + 1 / MAX_REQUESTS_PER_SECOND
+        await asyncio.sleep(start - now)
+
+    async def run(query_filter: dict) -> list[dict]:
+        pages = []
+        cursor = None
+        async with semaphore:
+            while True:
+                kwargs = {
+                    "data_source_id": database_id,
+                    "filter": query_filter,
+                }
+                if property_ids:
+                    kwargs["filter_properties"] = property_ids
+                if cursor:
+                    kwargs["start_cursor"] = cursor
+
+                await wait_turn()
+                response = await client.data_sources.query(**kwargs)
+                pages.extend(response["results"])
+
+                if not response.get("has_more"):
+                    return pages
+                cursor = response["next_cursor"]
+
+    results = await asyncio.gather(*(run(f) for f in partition_filters()))
+    merged = {}
+    for pages in results:
+        for page in pages:
+            merged.setdefault(page["id"], page)
+    return list(merged.values())
+
+
+async def _query_all_async(database_id: str, property_ids: list[str]) -> list[dict]:
+    # Not `async with`: entering the client would replace its httpx client
+    # and lose the request counting hooks
+    client = get_async_notion_client()
+    try:
+        return await query_database_async(client, database_id, property_ids)
+    finally:
+        await client.aclose()
+
+
+def page_to_task(page: dict) -> dict | None:
+    """Normalise a Notion page into a task dict, or None if it has no title."""
+    props = page["properties"]
+    text = get_title(props)
+    if not text:
+        return None
+
+    quick_prop = props.get("Quick", {})
+    return {
+        "text":     text,
+        "project":  get_select(props, "Project"),
+        "status":   (get_select(props, "Status") or "").lower(),
+        "priority": (get_select(props, "Priority") or "").lower() or None,
+        "effort":   (get_select(props, "Effort") or "").lower() or None,
+        "quick":    bool(quick_prop.get("checkbox", False)),
+    }
+
+
+def sync_tasks(client: Client, database_id: str, full_sync: bool = False) -> None:
+    """
+    Bring the local task store up to date with Notion.
+
+    Incremental by default: only pages edited since the stored watermark
+    (the newest last_edited_time seen so far) are fetched. Notion rounds
+    that timestamp to the minute, so the query is inclusive and a few
+    pages may be re-fetched — merging is idempotent. Falls back to a full
+    sync when no watermark exists yet; full syncs use the parallel async
+    queries. A full sync also runs when the last one is older than
+    FULL_SYNC_INTERVAL, to drop tasks deleted in Notion.
+    """
+    last_full_sync = float(store.get_state(f"notion-full:{database_id}") or 0)
+    if time.time() - last_full_sync > FULL_SYNC_INTERVAL:
+        full_sync = True
+    watermark = None if full_sync else store.get_state(f"notion:{database_id}")
+    property_ids = get_property_ids(client, database_id, refresh=watermark is None)
+    if watermark:
+        pages = query_database(client, database_id, edited_after=watermark, property_ids=property_ids)
+    else:
+        pages = asyncio.run(_query_all_async(database_id, property_ids))
+
+    upserts = {}
+    deletes = []
+    for page in pages:
+        task = page_to_task(page)
+        if task is None or task["status"] == "done":
+            deletes.append(page["id"])
+        else:
+            upserts[page["id"]] = task
+
+    new_watermark = max((p["last_edited_time"] for p in pages), default=watermark)
+    store.save_tasks(database_id, upserts, deletes, new_watermark, replace=watermark is None)
+    if watermark is None:
+        store.set_state(f"notion-full:{database_id}", str(time.time()))
+
+
+def get_todo_tasks(
+    database_id: str | None = None,
+    full_sync: bool = False,
+    offline: bool = False,
+) -> dict[str, list[dict]]:
     """
     Return tasks from the Notion database split by status:
       {
@@ -91,33 +337,21 @@ def get_todo_tasks(database_id: str | None = None) -> dict[str, list[dict]]:
       }
 
     Actionable tasks are sorted by priority (high first), then effort (high first).
+    With *offline*, the local store is read as of the last sync and Notion
+    is not contacted.
     """
     database_id = database_id or os.environ.get("NOTION_DATABASE_ID")
     if not database_id:
         raise ValueError("NOTION_DATABASE_ID not set in environment")
 
-    client = get_notion_client()
-    pages = query_database(client, database_id)
+    if not offline:
+        client = get_notion_client()
+        sync_tasks(client, database_id, full_sync=full_sync)
 
     actionable = []
     pending = []
 
-    for page in pages:
-        props = page["properties"]
-        text = get_title(props)
-        if not text:
-            continue
-
-        quick_prop = props.get("Quick", {})
-        task = {
-            "text":     text,
-            "project":  get_select(props, "Project"),
-            "status":   (get_select(props, "Status") or "").lower(),
-            "priority": (get_select(props, "Priority") or "").lower() or None,
-            "effort":   (get_select(props, "Effort") or "").lower() or None,
-            "quick":    bool(quick_prop.get("checkbox", False)),
-        }
-
+    for task in store.load_tasks(database_id):
         if task["status"] == "pending":
             pending.append(task)
         else:
@@ -153,19 +387,45 @@ def _format_task_line(task: dict) -> str:
     return base
 
 
-def format_tasks_for_prompt(tasks: dict[str, list[dict]]) -> str:
+def summarize_tasks(tasks: list[dict], kind: str, max_projects: int = 8) -> str:
+    """One line standing in for *tasks* left out of a prompt: how many, by
+    priority, and the projects with the most of them."""
+    by_priority = {}
+    by_project = {}
+    for task in tasks:
+        priority = task["priority"] or "unset"
+        by_priority[priority] = by_priority.get(priority, 0) + 1
+        project = task["project"] or "no project"
+        by_project[project] = by_project.get(project, 0) + 1
+
+    priorities = ", ".join(
+        f"{n} {priority}"
+        for priority, n in sorted(by_priority.items(), key=lambda item: PRIORITY_ORDER.get(item[0], 9))
+    )
+    projects = sorted(by_project.items(), key=lambda item: (-item[1], item[0]))
+    project_text = ", ".join(f"{project} ({n})" for project, n in projects[:max_projects])
+    if len(projects) > max_projects:
+        project_text += f" and {len(projects) - max_projects} more projects"
+    return f"- …and {len(tasks)} more {kind} tasks not listed ({priorities} priority) in {project_text}."
+
+
+def format_tasks_for_prompt(tasks: dict[str, list[dict]], omitted: dict[str, list[dict]] | None = None) -> str:
     """
     Format tasks for inclusion in a planning prompt.
 
     Actionable tasks are listed with their priority and effort.
     Pending tasks are listed separately and must never be scheduled.
+    Tasks in *omitted* are only summarised, one line per section.
     """
     sections = []
+    omitted = omitted or {}
 
     actionable = tasks.get("actionable", [])
     if actionable:
         sections.append("ACTIONABLE TASKS — schedule these, higher priority first, allow more time for higher effort:")
         sections.extend(_format_task_line(t) for t in actionable)
+        if omitted.get("actionable"):
+            sections.append(summarize_tasks(omitted["actionable"], "actionable") + " Do not schedule these.")
     else:
         sections.append("ACTIONABLE TASKS: none.")
 
@@ -174,5 +434,7 @@ def format_tasks_for_prompt(tasks: dict[str, list[dict]]) -> str:
         sections.append("\nPENDING TASKS — do NOT schedule these; list them in a 'Waiting / pending' section:")
         sections.extend(f"- [{t['project']}] {t['text']}" if t["project"] else f"- {t['text']}"
                         for t in pending)
+        if omitted.get("pending"):
+            sections.append(summarize_tasks(omitted["pending"], "pending"))
 
     return "\n".join(sections)
@@ -12,23 +12,54 @@ Usage:
   # Daily plan for a specific day (useful for planning ahead)
   python plan.py day thursday --arrive 11:30 --leave 15:00
 
+  # Daily plan printed and saved line by line as it is generated
+  python plan.py day --arrive 10:00 --leave 16:00 --stream
+
   # Daily plan referencing an existing week plan
   python plan.py day --arrive 10:00 --leave 16:00 --week-plan week_plan_10feb.md
 
+  # Daily plans for several days at once, generated in parallel
+  python plan.py days --hours "Mon 10-16, Wed 10-12:30, Thu 11:30-15, Fri 10-16"
+
+  # Daily plan listing only the 20 best-ranked tasks in the prompt; the rest are summarised
+  python plan.py day --arrive 10:00 --leave 16:00 --max-tasks 20
+
+  # Daily plan built by the local scheduler, from the last sync, without any network access
+  python plan.py day --arrive 10:00 --leave 16:00 --local --offline
+
   # Next task suggestion based on available time until next meeting / end of day
   python plan.py next --leave 17:00
+
+  # Gemini tokens, latency and estimated cost per mode and per day
+  python plan.py stats --days 7
+
+  # Serve requests from a warm background process; plan_client.py takes the same arguments as plan.py
+  python plan.py serve
+  python plan_client.py next --leave 17:00
+
+  # Any mode: re-download every task and event instead of only changes since the last run
+  python plan.py next --leave 17:00 --full-sync
+
+  # Any mode: show time, requests and bytes per stage; append them to a JSON-lines trace
+  python plan.py day --arrive 10:00 --leave 16:00 --timings --trace runs.jsonl
 """
 
 import argparse
 import datetime
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Any, Callable, Iterable
 from dotenv import load_dotenv
 
-from notion_tasks import get_todo_tasks, format_tasks_for_prompt
-from gcal_events import get_events_this_week, get_events_today, get_events_next_two_weeks, format_events_for_prompt
-from claude_planner import generate_weekly_plan, generate_daily_plan
+import spans
+from spans import span
+
+# The Notion, Calendar and Gemini SDKs are slow to import, so main() only
+# imports the modules a given mode needs, after the arguments are parsed.
+# `next` never loads google.genai. See benchmarks/bench_import_time.py.
 
 load_dotenv()
 
@@ -65,9 +96,10 @@ def apply_meeting_deadlines(tasks: dict, upcoming_events: list[dict]) -> dict:
     """
     today = datetime.date.today()
 
-    # Build list of (days_away, event_keywords, event_summary) for timed events
-    event_entries = []
-    for ev in upcoming_events:
+    # Index keyword → soonest (days_away, position, event_summary) mentioning it.
+    # Position breaks ties in favour of the earlier event, as a scan would.
+    soonest_by_keyword = {}
+    for position, ev in enumerate(upcoming_events):
         if ev["all_day"]:
             event_date = datetime.date.fromisoformat(ev["start"])
         else:
@@ -75,26 +107,24 @@ def apply_meeting_deadlines(tasks: dict, upcoming_events: list[dict]) -> dict:
         days_away = (event_date - today).days
         if days_away < 0:
             continue
-        event_entries.append((days_away, _keywords(ev["summary"]), ev["summary"]))
-
-    # Annotate each actionable task with its soonest matching meeting
+        entry = (days_away, position, ev["summary"])
+        for word in _keywords(ev["summary"]):
+            if word not in soonest_by_keyword or entry < soonest_by_keyword[word]:
+                soonest_by_keyword[word] = entry
+
+    # Annotate each actionable task with its soonest matching meeting,
+    # looking each distinct project up only once
+    soonest_by_project = {}
     for task in tasks.get("actionable", []):
         project = task.get("project") or ""
-        proj_keywords = _keywords(project)
-        if not proj_keywords:
-            continue
+        if project not in soonest_by_project:
+            matches = [soonest_by_keyword[w] for w in _keywords(project) if w in soonest_by_keyword]
+            soonest_by_project[project] = min(matches, default=None)
 
-        soonest_days = None
-        soonest_name = None
-        for days_away, ev_keywords, ev_summary in event_entries:
-            if proj_keywords & ev_keywords:  # any keyword overlap
-                if soonest_days is None or days_away < soonest_days:
-                    soonest_days = days_away
-                    soonest_name = ev_summary
-
-        if soonest_days is not None:
-            task["deadline_days"] = soonest_days
-            task["deadline_event"] = soonest_name
+        soonest = soonest_by_project[project]
+        if soonest is not None:
+            task["deadline_days"] = soonest[0]
+            task["deadline_event"] = soonest[2]
 
     # Re-sort: priority first, then deadline (soonest first), then effort
     from notion_tasks import PRIORITY_ORDER, EFFORT_ORDER
@@ -107,6 +137,39 @@ def apply_meeting_deadlines(tasks: dict, upcoming_events: list[dict]) -> dict:
     return tasks
 
 
+def rank_tasks(tasks: dict, free_minutes: int | None = None) -> dict:
+    """
+    Order actionable tasks best first for a planning prompt: by priority,
+    then soonest meeting deadline, then tasks that fit in *free_minutes*
+    (the longest free block in the period) before those that don't, then
+    effort. Run after apply_meeting_deadlines.
+    """
+    from notion_tasks import PRIORITY_ORDER, EFFORT_ORDER
+
+    def too_long(task: dict) -> bool:
+        if free_minutes is None:
+            return False
+        if task.get("quick"):
+            return free_minutes < 15
+        return free_minutes < EFFORT_MIN_MINUTES.get(task.get("effort") or "low", 1)
+
+    tasks["actionable"].sort(key=lambda t: (
+        PRIORITY_ORDER.get(t.get("priority"), 9),
+        t.get("deadline_days", 999),
+        too_long(t),
+        EFFORT_ORDER.get(t.get("effort"), 9),
+    ))
+    return tasks
+
+
+def longest_free_block(events: list[dict], date: datetime.date, arrive: str, leave: str) -> int:
+    """Minutes in the longest gap between *date*'s events from *arrive* to *leave*."""
+    from free_time import FreeTime
+
+    longest = FreeTime.from_events(events, date, parse_time(arrive), parse_time(leave)).longest()
+    return longest[1] - longest[0] if longest else 0
+
+
 def resolve_day(day_str: str | None) -> datetime.date:
     """Turn a day name like 'thursday' into the nearest upcoming date."""
     if day_str is None or day_str.lower() == "today":
@@ -140,6 +203,55 @@ def output_filename(mode: str, date: datetime.date | None = None) -> str:
         return f"day_plan_{d.strftime('%d%b').lower()}.md"
 
 
+def parse_start_date(start_date: str | None) -> datetime.date | None:
+    """Parse a DDMMYY --start-date into the Monday of its week (None if not given)."""
+    if not start_date:
+        return None
+    try:
+        date = datetime.datetime.strptime(start_date, "%d%m%y").date()
+    except ValueError:
+        print(f"Invalid --start-date '{start_date}'. Use DDMMYY format, e.g. 170225.")
+        sys.exit(1)
+    # Snap to Monday of the given date's week
+    return date - datetime.timedelta(days=date.weekday())
+
+
+def parse_hours(hours: str, monday: datetime.date | None = None) -> list[tuple[datetime.date, str, str]]:
+    """
+    Parse per-day working hours like "Mon 10-16, Wed 10-12:30" into
+    (date, arrive, leave) with times as HH:MM, in the order given. Days fall
+    in the week of *monday*, or else on their next occurrence from today.
+    Each day may appear only once.
+    """
+    days = []
+    for part in hours.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            day, times_text = part.split(None, 1)
+            weekday = DAY_NAMES[day.lower()]
+            times = []
+            for t in times_text.replace("–", "-").split("-"):
+                hour, _, minute = t.strip().partition(":")
+                times.append(datetime.time(int(hour), int(minute or 0)))
+            arrive, leave = times
+            if arrive >= leave:
+                raise ValueError
+        except (KeyError, ValueError):
+            print(f'Invalid working hours "{part}". Use e.g. "Mon 10-16, Wed 10-12:30".')
+            sys.exit(1)
+        if monday:
+            date = monday + datetime.timedelta(days=weekday)
+        else:
+            date = resolve_day(day)
+        if any(date == seen for seen, _, _ in days):
+            print(f'{date.strftime("%A")} appears more than once in "{hours}". Give each day one range.')
+            sys.exit(1)
+        days.append((date, arrive.strftime("%H:%M"), leave.strftime("%H:%M")))
+    return days
+
+
 def parse_time(time_str: str) -> datetime.time:
     """Parse a HH:MM string into a datetime.time."""
     try:
@@ -149,45 +261,87 @@ def parse_time(time_str: str) -> datetime.time:
         sys.exit(1)
 
 
-def next_task(tasks: dict, leave_time: datetime.time, events: list[dict]) -> None:
+def fetch_concurrently(
+    fetchers: dict[str, Callable[[], Any]],
+    stage: str = "fetch",
+) -> tuple[dict[str, Any], dict[str, dict]]:
+    """
+    Run each zero-argument fetcher in its own thread and wait for all of them.
+    Each fetcher runs in a span named "<stage> <name>" under the caller's
+    current span. Returns (results, span records) keyed like *fetchers*;
+    a record's "ms" and "counts" give its time, requests and bytes.
+    Any exception raised by a fetcher is re-raised here.
+    """
+    parent = spans.current()
+
+    def traced(name, fetch):
+        with span(f"{stage} {name}", parent=parent) as record:
+            result = fetch()
+        return result, record
+
+    with ThreadPoolExecutor(max_workers=len(fetchers)) as pool:
+        futures = {name: pool.submit(traced, name, fetch) for name, fetch in fetchers.items()}
+        results = {}
+        records = {}
+        for name, future in futures.items():
+            results[name], records[name] = future.result()
+    return results, records
+
+
+def write_streamed_plan(lines: Iterable[str], out_path: str) -> None:
+    """Print each plan line and append it to *out_path* as soon as it arrives."""
+    print()
+    with open(out_path, "w") as f:
+        for line in lines:
+            print(line, flush=True)
+            f.write(line + "\n")
+            f.flush()
+
+
+def next_task(
+    tasks: dict,
+    leave_time: datetime.time,
+    events: list[dict],
+    busy: list[tuple[datetime.datetime, datetime.datetime]] | None = None,
+) -> None:
     """
     Print the best next task given available time until the next meeting
     or end of working day, whichever comes first.
+
+    With *busy* (get_busy_intervals output) instead of *events*, meetings
+    have no titles and are shown as busy slots.
     """
+    from free_time import FreeTime, clock, event_minutes, minutes
+
     now = datetime.datetime.now()
     now_time = now.time()
     today = now.date()
-
-    # Find the next meeting after now (timed events only, not all-day)
-    upcoming = []
-    for ev in events:
-        if ev["all_day"]:
-            continue
-        start_dt = datetime.datetime.fromisoformat(ev["start"])
-        # Normalise to local naive time for comparison
-        start_local = start_dt.replace(tzinfo=None) if start_dt.tzinfo else start_dt
-        if start_local.date() == today and start_local.time() > now_time:
-            upcoming.append((start_local.time(), ev["summary"]))
-    upcoming.sort()
-
-    if upcoming:
-        next_meeting_time, next_meeting_name = upcoming[0]
-        # Only use meeting as deadline if it falls before end of working day
-        if next_meeting_time <= leave_time:
-            deadline = next_meeting_time
-            deadline_label = f"your next meeting ({next_meeting_name} at {next_meeting_time.strftime('%H:%M')})"
-        else:
-            deadline = leave_time
-            deadline_label = f"end of day ({leave_time.strftime('%H:%M')})"
+    now_mins = minutes(now_time)
+
+    # Free time from now until end of working day, around today's timed events
+    if busy is None:
+        free = FreeTime.from_events(events, today, now_time, leave_time)
+        meeting_names = {}
+        for ev in events:
+            if not ev["all_day"] and datetime.datetime.fromisoformat(ev["start"]).date() == today:
+                meeting_names.setdefault(event_minutes(ev)[0], ev["summary"])
+    else:
+        free = FreeTime.from_intervals(busy, today, now_time, leave_time)
+        meeting_names = {start: "busy slot" for start, _ in free.busy}
+
+    gap = free.gap_at(now_mins)
+    current = free.next_busy(now_mins) if gap is None else None
+    if current:
+        # Already in a meeting: the window starts now, so it is clipped to start now too
+        available_mins = 0
+        deadline_label = f"the end of your current meeting ({clock(current[1])})"
+    elif gap and gap[1] < free.end:
+        available_mins = gap[1] - now_mins
+        deadline_label = f"your next meeting ({meeting_names.get(gap[1], 'meeting')} at {clock(gap[1])})"
     else:
-        deadline = leave_time
+        available_mins = gap[1] - now_mins if gap else 0
         deadline_label = f"end of day ({leave_time.strftime('%H:%M')})"
 
-    # Calculate available minutes
-    now_dt = datetime.datetime.combine(today, now_time)
-    deadline_dt = datetime.datetime.combine(today, deadline)
-    available_mins = int((deadline_dt - now_dt).total_seconds() / 60)
-
     print(f"\nIt's {now_time.strftime('%H:%M')}. You have {available_mins} minutes until {deadline_label}.\n")
 
     if available_mins <= 0:
@@ -223,18 +377,71 @@ def next_task(tasks: dict, leave_time: datetime.time, events: list[dict]) -> Non
         print(f"  Priority: {priority}  |  Effort: {effort}")
 
     # Show what comes after
+    upcoming = [start for start in sorted(meeting_names) if start > now_mins]
     if upcoming:
-        print(f"\n  After that: {next_meeting_name} at {next_meeting_time.strftime('%H:%M')}")
+        print(f"\n  After that: {meeting_names[upcoming[0]]} at {clock(upcoming[0])}")
     else:
         print(f"\n  After that: end of day at {leave_time.strftime('%H:%M')}")
+    print(f"  Free time left today: {free.free_minutes(now_mins)} minutes")
 
 
-def main():
+def main(argv: list[str] | None = None):
     parser = argparse.ArgumentParser(description="Generate a daily or weekly plan.")
     subparsers = parser.add_subparsers(dest="mode", required=True)
 
+    # --- options shared by every mode ---
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--full-sync",
+        action="store_true",
+        help="Re-download all tasks and calendar events instead of only changes since the last run",
+    )
+    common.add_argument(
+        "--offline",
+        action="store_true",
+        help="Use tasks and events from the last sync without contacting Notion or Google Calendar",
+    )
+    common.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print a table of time, requests, bytes received and retries per stage",
+    )
+    common.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="Append one JSON line per timed stage to FILE",
+    )
+
+    # --- options shared by the Gemini-backed modes ---
+    cache_options = argparse.ArgumentParser(add_help=False)
+    cache_options.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call Gemini, even if an identical prompt was answered recently",
+    )
+    prompt_options = argparse.ArgumentParser(add_help=False, parents=[cache_options])
+    prompt_options.add_argument(
+        "--max-tasks",
+        type=int,
+        default=40,
+        help="List at most N actionable and N pending tasks in the prompt, best first; "
+        "the rest are summarised (default: 40, 0 for all)",
+    )
+    prompt_options.add_argument(
+        "--token-budget",
+        type=int,
+        default=4000,
+        help="List fewer tasks if the task list would take more than N prompt tokens (default: 4000, 0 for no limit)",
+    )
+    llm_options = argparse.ArgumentParser(add_help=False, parents=[prompt_options])
+    llm_options.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print the plan and write it to the output file line by line as Gemini generates it",
+    )
+
     # --- weekly mode ---
-    week_parser = subparsers.add_parser("week", help="Generate a weekly plan")
+    week_parser = subparsers.add_parser("week", parents=[common, llm_options], help="Generate a weekly plan")
     week_parser.add_argument(
         "--hours",
         required=True,
@@ -247,7 +454,7 @@ def main():
     week_parser.add_argument("--output", help="Output file path (default: auto-named)")
 
     # --- daily mode ---
-    day_parser = subparsers.add_parser("day", help="Generate a daily plan")
+    day_parser = subparsers.add_parser("day", parents=[common, llm_options], help="Generate a daily plan")
     day_parser.add_argument(
         "day_name",
         nargs="?",
@@ -257,97 +464,292 @@ def main():
     day_parser.add_argument("--arrive", default="10:00", help="Arrival time, e.g. 10:00 (default: 10:00)")
     day_parser.add_argument("--leave", default="18:00", help="Finish time, e.g. 18:00 (default: 18:00)")
     day_parser.add_argument("--week-plan", help="Path to an existing week plan for context")
+    day_parser.add_argument(
+        "--local",
+        action="store_true",
+        help="Build the plan with the local scheduler instead of Gemini (no API key or network needed)",
+    )
     day_parser.add_argument("--output", help="Output file path (default: auto-named)")
 
+    # --- several daily plans at once ---
+    days_parser = subparsers.add_parser(
+        "days", parents=[common, prompt_options], help="Generate daily plans for several days in parallel"
+    )
+    days_parser.add_argument(
+        "--hours",
+        required=True,
+        help='Arrive and leave times per day, e.g. "Mon 10-16, Wed 10-12:30, Thu 11:30-15"',
+    )
+    days_parser.add_argument(
+        "--start-date",
+        help="Any date in the target week as DDMMYY (default: the next occurrence of each day)",
+    )
+    days_parser.add_argument("--week-plan", help="Path to an existing week plan for context")
+
     # --- next task mode ---
-    next_parser = subparsers.add_parser("next", help="Suggest the next task given available time")
+    next_parser = subparsers.add_parser("next", parents=[common], help="Suggest the next task given available time")
     next_parser.add_argument("--leave", required=True, help="End of working day, e.g. 17:00")
+    next_parser.add_argument(
+        "--busy-only",
+        action="store_true",
+        help="Ask Google Calendar only for today's busy times (one small FreeBusy request); "
+        "meetings are shown untitled and meeting deadlines are not applied. Ignored with --offline",
+    )
+
+    # --- background server ---
+    serve_parser = subparsers.add_parser(
+        "serve", help="Keep clients warm and answer plan_client.py requests over a local socket"
+    )
+    serve_parser.add_argument(
+        "--refresh-minutes",
+        type=float,
+        default=5,
+        help="How often to sync tasks and events in the background (default: 5)",
+    )
+
+    # --- usage report ---
+    stats_parser = subparsers.add_parser("stats", help="Report Gemini token usage, latency and cost")
+    stats_parser.add_argument(
+        "--days", type=int, default=30, help="Report on calls from the last N days (default: 30)"
+    )
+
+    args = parser.parse_args(argv)
+
+    spans.start_run(getattr(args, "trace", None))
+    try:
+        run(args)
+    finally:
+        if getattr(args, "timings", False):
+            print("\nTimings:\n" + spans.summary())
+        spans.end_run()
+
+
+def run(args: argparse.Namespace) -> None:
+    """Carry out the mode chosen on the command line."""
+    if args.mode == "stats":
+        from usage import report
 
-    args = parser.parse_args()
+        print(report(args.days))
+        return
 
     # Check required env vars
-    for var in ("NOTION_TOKEN", "NOTION_DATABASE_ID"):
+    required = ("NOTION_DATABASE_ID",) if getattr(args, "offline", False) else ("NOTION_TOKEN", "NOTION_DATABASE_ID")
+    for var in required:
         if not os.environ.get(var):
             print(f"Error: {var} is not set. Copy .env.example to .env and fill it in.")
             sys.exit(1)
 
-    # next mode doesn't need Gemini
-    if args.mode != "next":
+    if args.mode == "serve":
+        from daemon import serve
+
+        serve(refresh_minutes=args.refresh_minutes)
+        return
+
+    # next mode and locally scheduled days don't need Gemini
+    if args.mode != "next" and not getattr(args, "local", False):
         if not os.environ.get("GEMINI_API_KEY"):
             print("Error: GEMINI_API_KEY is not set.")
             sys.exit(1)
 
-    print("Fetching tasks from Notion...")
-    tasks = get_todo_tasks()
+    from notion_tasks import get_todo_tasks
+    from gcal_events import (
+        EventWindow, get_day_bounds, get_week_bounds, get_next_two_weeks_bounds,
+        get_events_this_week, get_events_today, get_events_next_two_weeks, format_events_for_prompt,
+    )
+
+    # Resolve the target period up front so every fetch can start at once
+    if args.mode == "week":
+        monday = parse_start_date(args.start_date)
+        label = week_label(monday)
+        period = f"week of {label}"
+        period_bounds = get_week_bounds(monday)
+    elif args.mode == "day":
+        target_date = resolve_day(args.day_name)
+        day_label = target_date.strftime("%A %-d %B %Y")
+        period = day_label
+        period_bounds = get_day_bounds(target_date)
+    elif args.mode == "days":
+        day_hours = parse_hours(args.hours, parse_start_date(args.start_date))
+        if not day_hours:
+            print("No days given in --hours.")
+            sys.exit(1)
+        dates = [date for date, _, _ in day_hours]
+        period = f"{len(dates)} days to {max(dates).strftime('%A %-d %B')}"
+        period_bounds = (get_day_bounds(min(dates))[0], get_day_bounds(max(dates))[1])
+    else:
+        leave_time = parse_time(args.leave)
+        period = "today"
+        period_bounds = get_day_bounds()
+
+    busy_only = args.mode == "next" and args.busy_only and not args.offline
+    if busy_only:
+        # Local midnight to midnight: only busy times matter, not titles
+        from gcal_events import get_busy_intervals
+
+        day_start = datetime.datetime.combine(datetime.date.today(), datetime.time.min).astimezone()
+        fetch_calendar = partial(get_busy_intervals, day_start, day_start + datetime.timedelta(days=1))
+    else:
+        # One calendar fetch covers both deadline matching and the target period
+        window = EventWindow([get_next_two_weeks_bounds(), period_bounds])
+        fetch_calendar = partial(window.fetch, full_sync=args.full_sync, offline=args.offline)
+
+    if args.offline:
+        print(f"Loading tasks and calendar events for {period} from the last sync...")
+    else:
+        print(f"Fetching tasks from Notion and calendar events for {period}...")
+    results, records = fetch_concurrently({
+        "tasks": partial(get_todo_tasks, full_sync=args.full_sync, offline=args.offline),
+        "calendar": fetch_calendar,
+    })
+    print("  Timings: " + ", ".join(f"{name} {record['ms'] / 1000:.2f}s" for name, record in records.items()))
+    if not args.offline:
+        calendar_counts = records["calendar"]["counts"]
+        print(
+            f"  Calendar: {calendar_counts.get('requests', 0)} requests, "
+            f"{calendar_counts.get('bytes', 0) / 1024:.1f} kB received"
+        )
+
+    tasks = results["tasks"]
     n_actionable = len(tasks["actionable"])
     n_pending = len(tasks["pending"])
     print(f"  Found {n_actionable} actionable, {n_pending} pending.")
 
-    print("Fetching upcoming calendar events for deadline matching...")
-    upcoming_events = get_events_next_two_weeks()
-    tasks = apply_meeting_deadlines(tasks, upcoming_events)
-    print(f"  Checked {len(upcoming_events)} upcoming events for deadline matches.")
+    if busy_only:
+        busy = results["calendar"]
+        print(f"  Found {len(busy)} busy periods today.")
+        with span("next task"):
+            next_task(tasks, leave_time, [], busy=busy)
+        return
 
-    tasks_text = format_tasks_for_prompt(tasks)
+    upcoming_events = get_events_next_two_weeks(window)
+    with span("deadline matching"):
+        tasks = apply_meeting_deadlines(tasks, upcoming_events)
+    print(f"  Checked {len(upcoming_events)} upcoming events for deadline matches.")
 
     if args.mode == "week":
-        monday = None
-        if args.start_date:
-            try:
-                monday = datetime.datetime.strptime(args.start_date, "%d%m%y").date()
-            except ValueError:
-                print(f"Invalid --start-date '{args.start_date}'. Use DDMMYY format, e.g. 170225.")
-                sys.exit(1)
-            # Snap to Monday of the given date's week
-            monday = monday - datetime.timedelta(days=monday.weekday())
+        events = get_events_this_week(monday, window)
+    elif args.mode == "day":
+        events = get_events_today(target_date, window)
+    elif args.mode == "days":
+        events = window.slice(*period_bounds)
+    else:
+        events = get_events_today(window=window)
+    print(f"  Found {len(events)} events for {period}.")
 
-        label = week_label(monday)
-        print(f"Fetching calendar events for week of {label}...")
-        events = get_events_this_week(monday)
+    with span("format prompt"):
         events_text = format_events_for_prompt(events)
-        print(f"  Found {len(events)} events.")
 
-        print("Generating weekly plan with Gemini...")
-        plan = generate_weekly_plan(
+    if args.mode != "next" and not getattr(args, "local", False):
+        from claude_planner import select_tasks
+
+        # Rank for the longest free block; a week has room for anything
+        if args.mode == "day":
+            free_minutes = longest_free_block(events, target_date, args.arrive, args.leave)
+        elif args.mode == "days":
+            free_minutes = max(
+                longest_free_block(get_events_today(date, window), date, arrive, leave)
+                for date, arrive, leave in day_hours
+            )
+        else:
+            free_minutes = None
+        with span("select tasks"):
+            prompt_tasks, tasks_text = select_tasks(
+                rank_tasks(tasks, free_minutes), args.max_tasks, args.token_budget
+            )
+        n_listed = len(prompt_tasks["actionable"]) + len(prompt_tasks["pending"])
+        if n_listed < n_actionable + n_pending:
+            print(f"  Listing the top {n_listed} of {n_actionable + n_pending} tasks in the prompt.")
+
+    if args.mode == "week":
+        from claude_planner import generate_weekly_plan, stream_weekly_plan
+
+        plan_kwargs = dict(
             tasks_text=tasks_text,
             events_text=events_text,
             week_label=label,
             working_hours=args.hours,
-            tasks=tasks,
+            tasks=prompt_tasks,
+            use_cache=not args.no_cache,
         )
-
         out_path = args.output or output_filename("week", monday)
-        Path(out_path).write_text(plan)
+
+        print("Generating weekly plan with Gemini...")
+        if args.stream:
+            with span("plan and write (streamed)"):
+                write_streamed_plan(stream_weekly_plan(**plan_kwargs), out_path)
+        else:
+            with span("plan"):
+                plan = generate_weekly_plan(**plan_kwargs)
+            with span("write"):
+                Path(out_path).write_text(plan)
         print(f"\nWeekly plan written to: {out_path}")
 
-    elif args.mode == "day":
-        target_date = resolve_day(args.day_name)
-        day_label = target_date.strftime("%A %-d %B %Y")
+    elif args.mode == "day" and args.local:
+        from scheduler import schedule_day
 
-        print(f"Fetching calendar events for {day_label}...")
-        events = get_events_today(target_date)
-        events_text = format_events_for_prompt(events)
-        print(f"  Found {len(events)} events.")
+        with span("plan (local scheduler)"):
+            plan = schedule_day(tasks, events, target_date, parse_time(args.arrive), parse_time(args.leave))
+        out_path = args.output or output_filename("day", target_date)
+        with span("write"):
+            Path(out_path).write_text(plan)
+        print(f"\n{plan}")
+        print(f"Daily plan written to: {out_path}")
 
-        print("Generating daily plan with Gemini...")
-        plan = generate_daily_plan(
+    elif args.mode == "day":
+        from claude_planner import generate_daily_plan, stream_daily_plan
+
+        plan_kwargs = dict(
             tasks_text=tasks_text,
             events_text=events_text,
             day_label=day_label,
             arrive=args.arrive,
             leave=args.leave,
             week_plan_path=args.week_plan,
-            tasks=tasks,
+            tasks=prompt_tasks,
+            use_cache=not args.no_cache,
         )
-
         out_path = args.output or output_filename("day", target_date)
-        Path(out_path).write_text(plan)
+
+        print("Generating daily plan with Gemini...")
+        if args.stream:
+            with span("plan and write (streamed)"):
+                write_streamed_plan(stream_daily_plan(**plan_kwargs), out_path)
+        else:
+            with span("plan"):
+                plan = generate_daily_plan(**plan_kwargs)
+            with span("write"):
+                Path(out_path).write_text(plan)
         print(f"\nDaily plan written to: {out_path}")
 
+    elif args.mode == "days":
+        from claude_planner import generate_daily_plan
+
+        # One Gemini request per day, all in flight at once, keyed by output file
+        plans = {}
+        for date, arrive, leave in day_hours:
+            plans[output_filename("day", date)] = partial(
+                generate_daily_plan,
+                tasks_text=tasks_text,
+                events_text=format_events_for_prompt(get_events_today(date, window)),
+                day_label=date.strftime("%A %-d %B %Y"),
+                arrive=arrive,
+                leave=leave,
+                week_plan_path=args.week_plan,
+                tasks=prompt_tasks,
+                use_cache=not args.no_cache,
+            )
+
+        print(f"Generating {len(plans)} daily plans with Gemini...")
+        results, records = fetch_concurrently(plans, stage="plan")
+        print()
+        for out_path, plan in results.items():
+            with span("write"):
+                Path(out_path).write_text(plan)
+            print(f"Daily plan written to: {out_path} ({records[out_path]['ms'] / 1000:.2f}s)")
+
     elif args.mode == "next":
-        leave_time = parse_time(args.leave)
-        events = get_events_today()
-        next_task(tasks, leave_time, events)
+        with span("next task"):
+            next_task(tasks, leave_time, events)
 
 
 if __name__ == "__main__":
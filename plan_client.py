@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Thin client for `python plan.py serve`.
+
+Takes the same arguments as plan.py, hands them to the running server and
+prints the output as it arrives, so a command costs little more than
+interpreter start-up. If no server is running, the command runs here
+instead, exactly as plan.py would.
+
+Usage:
+  python plan_client.py next --leave 17:00
+  python plan_client.py day --arrive 10:00 --leave 16:00
+"""
+
+import json
+import os
+import socket
+import sys
+
+from daemon import SOCKET_PATH
+
+
+def main(argv: list[str]) -> int:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(SOCKET_PATH))
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        import plan
+
+        plan.main(argv)
+        return 0
+
+    with sock:
+        sock.sendall(json.dumps({"argv": argv, "cwd": os.getcwd()}).encode() + b"\n")
+        out = sys.stdout.buffer
+        status = None
+        while chunk := sock.recv(65536):
+            if status is not None:
+                status += chunk
+                continue
+            text, nul, rest = chunk.partition(b"\0")
+            out.write(text)
+            out.flush()
+            if nul:
+                status = rest
+    # No status means the server died mid-request
+    return int(status) if status else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
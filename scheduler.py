@@ -0,0 +1,143 @@
+"""
+Build a time-blocked daily plan locally, without calling Gemini.
+
+Follows the same rules the LLM is given in claude_planner._SHARED_PRINCIPLES:
+  - calendar events are placed first, exactly as given
+  - fixed daily blocks: Bentyfields check (not Fridays), two email slots,
+    30 minutes of lunch between 12:00 and 13:00
+  - quick tasks take 15 minutes and go into the shortest gap that fits
+  - effort sets block length (high 2h, medium 1h, low 30 min), taken in
+    priority order, earliest gap first
+  - a high-effort task that fits nowhere in one block may be split into
+    two sessions of at least an hour
+  - pending tasks are never scheduled; anything that doesn't fit is
+    carried forward
+
+The output uses the same markdown format as the Gemini plans, so it can be
+written straight to day_plan_*.md.
+"""
+
+import datetime
+
+from free_time import FreeTime, clock, event_minutes, minutes, starts_on
+
+# Minutes allocated per task
+QUICK_MINUTES = 15
+EFFORT_MINUTES = {"high": 120, "medium": 60, "low": 30}
+# Shortest session a split deep-work task may be cut into
+MIN_SESSION_MINUTES = 60
+
+LUNCH_WINDOW = (12 * 60, 13 * 60)
+LUNCH_MINUTES = 30
+# Email slots are placed as close to these times as the schedule allows
+EMAIL_TARGETS = (11 * 60, 15 * 60)
+EMAIL_MINUTES = 15
+BENTYFIELDS_MINUTES = 30
+
+
+def _place_near(free: FreeTime, duration: int, target: int, lo: int, hi: int) -> int | None:
+    """Return the start closest to *target* of a free slot of *duration* within [lo, hi]."""
+    best = None
+    for gap_start, gap_end in free.gaps(duration):
+        earliest = max(gap_start, lo)
+        latest = min(gap_end, hi) - duration
+        if latest < earliest:
+            continue
+        start = min(max(target, earliest), latest)
+        if best is None or abs(start - target) < abs(best - target):
+            best = start
+    return best
+
+
+def _task_label(task: dict, session: str = "") -> str:
+    project_tag = f"[{task['project']}] " if task.get("project") else ""
+    text = f"{project_tag}{task['text']}{session}"
+    priority = task.get("priority") or "unset"
+    if task.get("quick"):
+        return f"{text} (quick — 15 min, priority: {priority})"
+    effort = task.get("effort") or "unset"
+    return f"{text} (priority: {priority}, effort: {effort})"
+
+
+def schedule_day(
+    tasks: dict,
+    events: list[dict],
+    date: datetime.date,
+    arrive: datetime.time,
+    leave: datetime.time,
+) -> str:
+    """Return a markdown time-blocked plan for *date* between *arrive* and *leave*."""
+    day_start, day_end = minutes(arrive), minutes(leave)
+    free = FreeTime.from_events(events, date, arrive, leave)
+    blocks = []  # (start, end, label)
+
+    all_day = []
+    for ev in events:
+        if ev["all_day"]:
+            all_day.append(ev["summary"])
+        elif starts_on(ev, date):
+            # Only the part of the meeting within working hours
+            start, end = event_minutes(ev)
+            start, end = max(start, day_start), min(end, day_end)
+            if start < end:
+                blocks.append((start, end, f"Meeting: {ev['summary']}"))
+
+    fixed = []
+    if date.weekday() != 4:
+        fixed.append(("Check Bentyfields", BENTYFIELDS_MINUTES, day_start, day_start, day_end))
+    fixed.append(("Lunch", LUNCH_MINUTES, LUNCH_WINDOW[0], *LUNCH_WINDOW))
+    fixed.extend(("Check emails", EMAIL_MINUTES, target, day_start, day_end) for target in EMAIL_TARGETS)
+    for label, duration, target, lo, hi in fixed:
+        start = _place_near(free, duration, target, lo, hi)
+        if start is not None:
+            blocks.append((start, start + duration, label))
+            free.reserve(start, start + duration)
+
+    carry_forward = []
+    for task in tasks.get("actionable", []):
+        label = _task_label(task)
+
+        if task.get("quick"):
+            fitting = free.gaps(QUICK_MINUTES)
+            if not fitting:
+                carry_forward.append(label)
+                continue
+            gap = min(fitting, key=lambda g: g[1] - g[0])
+            blocks.append((gap[0], gap[0] + QUICK_MINUTES, label))
+            free.reserve(gap[0], gap[0] + QUICK_MINUTES)
+            continue
+
+        duration = EFFORT_MINUTES.get(task.get("effort") or "low", EFFORT_MINUTES["low"])
+        fitting = free.gaps(duration)
+        if fitting:
+            gap = fitting[0]
+            blocks.append((gap[0], gap[0] + duration, label))
+            free.reserve(gap[0], gap[0] + duration)
+            continue
+
+        # Deep work that doesn't fit in one block: two sessions of at least an hour
+        half = duration // 2
+        sessions = free.gaps(max(half, MIN_SESSION_MINUTES))[:2]
+        if task.get("effort") == "high" and len(sessions) == 2:
+            for i, g in enumerate(sessions, start=1):
+                blocks.append((g[0], g[0] + half, _task_label(task, f" (session {i}/2)")))
+                free.reserve(g[0], g[0] + half)
+        else:
+            carry_forward.append(label)
+
+    lines = [f"# Plan for {date.strftime('%A %-d %B %Y')} — {clock(day_start)} to {clock(day_end)}", ""]
+    for summary in all_day:
+        lines.append(f"All day: {summary}")
+    if all_day:
+        lines.append("")
+    for start, end, label in sorted(blocks):
+        lines.append(f"- [ ] {clock(start)}–{clock(end)} — {label}")
+
+    pending = tasks.get("pending", [])
+    if pending:
+        lines += ["", "## Waiting / pending"]
+        lines += [f"- [{t['project']}] {t['text']}" if t.get("project") else f"- {t['text']}" for t in pending]
+    if carry_forward:
+        lines += ["", "## Carry-forward"]
+        lines += [f"- {label}" for label in carry_forward]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,129 @@
+"""
+Per-stage timings and counters for a plan.py run.
+
+Wrap a stage in `with span("fetch tasks"):`. While it is open, count()
+calls on the same thread (API requests, bytes received, retries) are
+added to it, and to its enclosing spans when it closes. Finished spans
+are kept for summary(), the table printed by --timings, and written one
+JSON object per line to the trace file given to start_run().
+"""
+
+import contextlib
+import itertools
+import json
+import threading
+import time
+import uuid
+
+_local = threading.local()
+_lock = threading.Lock()
+_ids = itertools.count(1)
+_finished: list[dict] = []
+_run_id = None
+_trace = None
+
+
+def _stack() -> list[dict]:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def current() -> dict | None:
+    """The innermost open span on this thread, or None."""
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+def start_run(trace_path: str | None = None) -> None:
+    """Forget earlier spans and, with *trace_path*, append this run's spans to it."""
+    global _run_id, _trace
+    end_run()
+    with _lock:
+        _finished.clear()
+        _run_id = uuid.uuid4().hex[:12]
+        if trace_path:
+            _trace = open(trace_path, "a")
+
+
+def end_run() -> None:
+    """Close the trace file, if any."""
+    global _trace
+    with _lock:
+        if _trace:
+            _trace.close()
+            _trace = None
+
+
+@contextlib.contextmanager
+def span(name: str, parent: dict | None = None, **attrs):
+    """
+    Time the enclosed block as a span called *name*, inside the innermost
+    open span on this thread — or inside *parent*, for work handed to
+    another thread. Extra keyword arguments are recorded with it.
+    """
+    parent = parent or current()
+    record = {
+        "run": _run_id,
+        "id": next(_ids),
+        "parent": parent["id"] if parent else None,
+        "name": name,
+        "depth": parent["depth"] + 1 if parent else 0,
+        "start": time.time(),
+        **attrs,
+        "counts": {},
+    }
+    stack = _stack()
+    stack.append(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException as err:
+        record["error"] = type(err).__name__
+        raise
+    finally:
+        record["ms"] = round((time.perf_counter() - started) * 1000, 3)
+        stack.pop()
+        with _lock:
+            if parent:
+                for key, value in record["counts"].items():
+                    parent["counts"][key] = parent["counts"].get(key, 0) + value
+            _finished.append(record)
+            if _trace:
+                _trace.write(json.dumps(record) + "\n")
+                _trace.flush()
+
+
+def count(key: str, amount: int = 1) -> None:
+    """Add *amount* to counter *key* ("requests", "bytes", "retries", ...)
+    of the innermost open span on this thread. No-op outside any span."""
+    record = current()
+    if record is not None:
+        with _lock:
+            record["counts"][key] = record["counts"].get(key, 0) + amount
+
+
+def summary() -> str:
+    """The finished spans as a table, nested stages indented under their parents."""
+    # Depth-first from the roots, children in start order
+    children = {}
+    for record in sorted(_finished, key=lambda r: r["start"]):
+        children.setdefault(record["parent"], []).append(record)
+    rows = []
+
+    def walk(parent_id):
+        for record in children.get(parent_id, []):
+            rows.append(record)
+            walk(record["id"])
+
+    walk(None)
+
+    lines = [f"  {'stage':<36}{'ms':>10}{'requests':>10}{'kB':>10}{'retries':>9}"]
+    for record in rows:
+        counts = record["counts"]
+        kb = f"{counts['bytes'] / 1024:.1f}" if "bytes" in counts else ""
+        lines.append(
+            f"  {'  ' * record['depth'] + record['name']:<36}{record['ms']:10.1f}"
+            f"{counts.get('requests', ''):>10}{kb:>10}{counts.get('retries', ''):>9}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,181 @@
+"""
+Local SQLite store for data synced from Notion and Google Calendar, so
+repeat runs only fetch what changed since the last sync, plus a cache of
+Gemini responses.
+
+The database lives next to token.json as nexttask.db. Every call opens
+its own short-lived connection, so the helpers are safe to use from
+worker threads.
+"""
+
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+STORE_PATH = Path(__file__).parent / "nexttask.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    database_id TEXT NOT NULL,
+    page_id     TEXT NOT NULL,
+    data        TEXT NOT NULL,
+    PRIMARY KEY (database_id, page_id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    calendar_id TEXT NOT NULL,
+    event_id    TEXT NOT NULL,
+    data        TEXT NOT NULL,
+    PRIMARY KEY (calendar_id, event_id)
+);
+CREATE TABLE IF NOT EXISTS responses (
+    key       TEXT PRIMARY KEY,
+    text      TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    created   REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+@contextmanager
+def connect():
+    """Open the store, creating tables on first use. Commits on clean exit."""
+    conn = sqlite3.connect(STORE_PATH)
+    try:
+        conn.executescript(_SCHEMA)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def get_state(key: str) -> str | None:
+    with connect() as conn:
+        row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def set_state(key: str, value: str | None) -> None:
+    with connect() as conn:
+        _set_state(conn, key, value)
+
+
+def _set_state(conn: sqlite3.Connection, key: str, value: str | None) -> None:
+    conn.execute(
+        "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, value),
+    )
+
+
+def load_tasks(database_id: str) -> list[dict]:
+    """Return every stored task for *database_id*, oldest insert first."""
+    with connect() as conn:
+        rows = conn.execute(
+            "SELECT data FROM tasks WHERE database_id = ? ORDER BY rowid", (database_id,)
+        ).fetchall()
+    return [json.loads(data) for (data,) in rows]
+
+
+def save_tasks(
+    database_id: str,
+    upserts: dict[str, dict],
+    deletes: list[str],
+    watermark: str | None,
+    replace: bool = False,
+) -> None:
+    """
+    Merge a sync result into the store in one transaction.
+
+    *upserts* maps page id → task dict, *deletes* lists page ids that left
+    the todo list (done, trashed or untitled). With *replace*, every stored
+    task for the database is dropped first (full resync).
+    """
+    with connect() as conn:
+        if replace:
+            conn.execute("DELETE FROM tasks WHERE database_id = ?", (database_id,))
+        conn.executemany(
+            "DELETE FROM tasks WHERE database_id = ? AND page_id = ?",
+            [(database_id, page_id) for page_id in deletes],
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO tasks (database_id, page_id, data) VALUES (?, ?, ?)",
+            [(database_id, page_id, json.dumps(task)) for page_id, task in upserts.items()],
+        )
+        _set_state(conn, f"notion:{database_id}", watermark)
+
+
+def load_events(calendar_id: str) -> list[dict]:
+    """Return every cached event for *calendar_id*, in no particular order."""
+    with connect() as conn:
+        rows = conn.execute(
+            "SELECT data FROM events WHERE calendar_id = ?", (calendar_id,)
+        ).fetchall()
+    return [json.loads(data) for (data,) in rows]
+
+
+def save_events(
+    calendar_id: str,
+    upserts: dict[str, dict],
+    deletes: list[str],
+    state: str | None,
+    replace: bool = False,
+) -> None:
+    """
+    Merge a calendar sync result into the store in one transaction.
+
+    *upserts* maps event id → event dict, *deletes* lists cancelled event
+    ids, and *state* is the serialised sync token and coverage to resume
+    from. With *replace*, the calendar's cached events are dropped first.
+    """
+    with connect() as conn:
+        if replace:
+            conn.execute("DELETE FROM events WHERE calendar_id = ?", (calendar_id,))
+        conn.executemany(
+            "DELETE FROM events WHERE calendar_id = ? AND event_id = ?",
+            [(calendar_id, event_id) for event_id in deletes],
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO events (calendar_id, event_id, data) VALUES (?, ?, ?)",
+            [(calendar_id, event_id, json.dumps(event)) for event_id, event in upserts.items()],
+        )
+        _set_state(conn, f"gcal:{calendar_id}", state)
+
+
+def get_response(key: str, ttl: float) -> str | None:
+    """Return the cached response for *key* if it is younger than *ttl* seconds."""
+    now = time.time()
+    with connect() as conn:
+        row = conn.execute(
+            "SELECT text FROM responses WHERE key = ? AND created > ?", (key, now - ttl)
+        ).fetchone()
+        if row:
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+    return row[0] if row else None
+
+
+def put_response(key: str, text: str, ttl: float, max_bytes: int) -> None:
+    """
+    Cache *text* under *key*, then evict expired entries and, if the cache
+    is still over *max_bytes*, the least recently used ones.
+    """
+    now = time.time()
+    with connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, text, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+            (key, text, len(text.encode()), now, now),
+        )
+        conn.execute("DELETE FROM responses WHERE created <= ?", (now - ttl,))
+        total = 0
+        for entry_key, size in conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_used DESC"
+        ).fetchall():
+            total += size
+            if total > max_bytes:
+                conn.execute("DELETE FROM responses WHERE key = ?", (entry_key,))
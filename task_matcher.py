@@ -0,0 +1,85 @@
+"""
+Find which known task a line of plan text refers to.
+
+Task texts are compiled once into an Aho-Corasick automaton, so each line
+is scanned in a single pass however many tasks there are, and the longest
+task text found in the line wins.
+"""
+
+from bisect import bisect_right
+from collections import deque
+
+
+class TaskMatcher:
+    """
+    Multi-pattern matcher over lowercase task texts.
+
+    *patterns* maps task text → value (e.g. a project tag). match() returns
+    the value for the longest task text contained in a line, with ties
+    going to the pattern listed first. If none is contained, it falls back
+    to a task text that contains the whole line (Gemini shortened it).
+    """
+
+    def __init__(self, patterns: dict[str, str]):
+        self._values = list(patterns.values())
+
+        # Trie of the patterns; _best[node] is the best pattern ending at
+        # node or any of its suffixes, as (length, -index) so max() wins
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail = [0]
+        self._best: list[tuple[int, int] | None] = [None]
+        for index, text in enumerate(patterns):
+            if not text:
+                continue
+            node = 0
+            for ch in text:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._best.append(None)
+                node = nxt
+            self._best[node] = (len(text), -index)
+
+        # Breadth-first pass to set failure links and inherit suffix matches
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                candidates = [b for b in (self._best[child], self._best[self._fail[child]]) if b]
+                self._best[child] = max(candidates, default=None)
+                queue.append(child)
+
+        # For the reverse check: all texts in one string, searched in C
+        self._joined = "\0".join(patterns)
+        self._offsets = []
+        offset = 0
+        for text in patterns:
+            self._offsets.append(offset)
+            offset += len(text) + 1
+
+    def match(self, line: str) -> str | None:
+        """Return the value of the task that *line* (lowercase) refers to, or None."""
+        node = 0
+        best = None
+        for ch in line:
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            found = self._best[node]
+            if found and (best is None or found > best):
+                best = found
+        if best:
+            return self._values[-best[1]]
+
+        if line and "\0" not in line:
+            position = self._joined.find(line)
+            if position >= 0:
+                return self._values[bisect_right(self._offsets, position) - 1]
+        return None
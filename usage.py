@@ -0,0 +1,122 @@
+"""
+Token and latency log for Gemini calls, and the `plan.py stats` report.
+
+Every request claude_planner sends to Gemini appends one JSON line to
+USAGE_LOG_PATH: the mode, prompt / cached / output token counts, latency,
+and the size of the task list in the prompt. Plans served from the local
+response cache make no request and aren't logged.
+"""
+
+import datetime
+import json
+import math
+import threading
+from pathlib import Path
+
+USAGE_LOG_PATH = Path(__file__).parent / "gemini_usage.jsonl"
+
+# USD per million tokens: list prices for gemini-2.0-flash
+# (claude_planner.MODEL). Update them together.
+PRICE_PER_MILLION = {"prompt": 0.10, "cached": 0.025, "output": 0.40}
+
+_lock = threading.Lock()
+
+
+def token_counts(usage_metadata) -> dict:
+    """Prompt, cached and output token counts from a response's usage_metadata."""
+    def get(name):
+        return (getattr(usage_metadata, name, None) or 0) if usage_metadata else 0
+
+    return {
+        "prompt_tokens": get("prompt_token_count"),
+        "cached_tokens": get("cached_content_token_count"),
+        "output_tokens": get("candidates_token_count"),
+    }
+
+
+def log_usage(record: dict) -> None:
+    """Append *record*, stamped with the current time, to the usage log."""
+    record = {"time": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"), **record}
+    with _lock, open(USAGE_LOG_PATH, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def load_usage(since: datetime.datetime | None = None) -> list[dict]:
+    """Logged calls, oldest first, optionally only those at or after *since*."""
+    if not USAGE_LOG_PATH.exists():
+        return []
+    records = []
+    with open(USAGE_LOG_PATH) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted write
+                continue
+            if since is None or datetime.datetime.fromisoformat(record["time"]) >= since:
+                records.append(record)
+    return records
+
+
+def cost(record: dict) -> float:
+    """Estimated cost of one call in USD."""
+    uncached = record["prompt_tokens"] - record["cached_tokens"]
+    return (
+        uncached * PRICE_PER_MILLION["prompt"]
+        + record["cached_tokens"] * PRICE_PER_MILLION["cached"]
+        + record["output_tokens"] * PRICE_PER_MILLION["output"]
+    ) / 1_000_000
+
+
+def percentile(values: list[float], q: float) -> float:
+    """The *q* quantile (0–1) of *values* by the nearest-rank method."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def _row(label: str, records: list[dict]) -> str:
+    n = len(records)
+    latencies = [r["latency_ms"] for r in records]
+    tasks = [r["tasks"] for r in records if r.get("tasks") is not None]
+    return (
+        f"  {label:<12}{n:>6}"
+        f"{percentile(latencies, 0.5):>9.0f}{percentile(latencies, 0.95):>9.0f}"
+        f"{sum(tasks) / len(tasks) if tasks else 0:>8.0f}"
+        f"{sum(r['prompt_tokens'] for r in records) / n:>10.0f}"
+        f"{sum(r['cached_tokens'] for r in records) / n:>9.0f}"
+        f"{sum(r['output_tokens'] for r in records) / n:>9.0f}"
+        f"{sum(cost(r) for r in records):>10.4f}"
+    )
+
+
+def report(days: int = 30) -> str:
+    """Usage over the last *days* days, per mode and per day."""
+    since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
+    records = load_usage(since)
+    if not records:
+        return f"No Gemini calls logged in the last {days} days."
+
+    header = (
+        f"  {'':<12}{'calls':>6}{'p50 ms':>9}{'p95 ms':>9}{'tasks':>8}"
+        f"{'prompt':>10}{'cached':>9}{'output':>9}{'cost $':>10}"
+    )
+    lines = [
+        f"Gemini usage over the last {days} days: {len(records)} calls, "
+        f"~${sum(cost(r) for r in records):.4f} at list prices.",
+        "Tasks and token counts are averages per call.",
+        "",
+        "Per mode:",
+        header,
+    ]
+    by_mode = {}
+    for record in records:
+        by_mode.setdefault(record["mode"], []).append(record)
+    lines += [_row(mode, group) for mode, group in sorted(by_mode.items())]
+
+    lines += ["", "Per day:", header]
+    by_day = {}
+    for record in records:
+        day = datetime.datetime.fromisoformat(record["time"]).astimezone().date()
+        by_day.setdefault(day.isoformat(), []).append(record)
+    lines += [_row(day, group) for day, group in sorted(by_day.items())]
+    return "\n".join(lines)